@@ -0,0 +1,476 @@
+"""
+Offline benchmark and load test for the bot.
+
+This drives the real command handlers, button callbacks and gateway event handlers in bot.py
+against a fake Discord gateway and the bot's embedded SQLite backend. No guild, token or
+database server is needed. Each workload reports throughput, p50/p99 latency, and the number of
+database round trips and Discord REST calls per operation.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --events 1000 --rsvps 10000 --quotes 500 --api-latency 0.02
+    python benchmark.py --output before.json
+    python benchmark.py --baseline before.json
+"""
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# bot.py reads its configuration when it is imported
+GUILD_ID = 1000
+FORUM_CHANNEL_ID = 1001
+ADMIN_CHANNEL_ID = 1002
+BOT_CHANNEL_ID = 1003
+QUOTE_CHANNEL_ID = 1004
+MOD_CHANNEL_ID = 1005
+GENERAL_CHANNEL_ID = 1006
+CHEESECAKE_USER_ID = 1
+BOT_USER_ID = 2
+
+TEMP_DIR = tempfile.mkdtemp(prefix="mmbot-benchmark-")
+
+os.environ.update({
+    "GUILD_ID": str(GUILD_ID),
+    "FORUM_CHANNEL_ID": str(FORUM_CHANNEL_ID),
+    "ADMIN_CHANNEL_ID": str(ADMIN_CHANNEL_ID),
+    "BOT_CHANNEL_ID": str(BOT_CHANNEL_ID),
+    "QUOTE_CHANNEL_ID": str(QUOTE_CHANNEL_ID),
+    "MOD_CHANNEL_ID": str(MOD_CHANNEL_ID),
+    "CHEESECAKE_USER_ID": str(CHEESECAKE_USER_ID),
+    "BOT_TOKEN": "benchmark",
+    "LOG_FILE_NAME": os.path.join(TEMP_DIR, "bot.log"),
+    "DB_BACKEND": "sqlite",
+    "SQLITE_PATH": os.path.join(TEMP_DIR, "benchmark.db"),
+    # Digests are flushed explicitly at the end of each workload
+    "JOIN_DIGEST_DELAY": "3600",
+    # A failed approval fails the benchmark instead of being retried
+    "APPROVAL_MAX_ATTEMPTS": "1",
+})
+
+import bot as mmbot
+
+
+class Counter:
+    """A thread-safe counter, since queries run on the DB executor threads."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+
+db_round_trips = Counter()
+
+
+class CountingCursor:
+    """Counts every statement sent to the database."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        db_round_trips.add()
+        self._cursor.execute(query, params)
+
+    def executemany(self, query, rows):
+        db_round_trips.add()
+        self._cursor.executemany(query, rows)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection(mmbot.SQLiteConnection):
+    def cursor(self):
+        return CountingCursor(super().cursor())
+
+
+class FakeGateway:
+    """
+    Stands in for the parts of discord.py the bot uses.
+
+    Every coroutine that would be a REST call is counted and sleeps for `api_latency` seconds.
+    """
+
+    def __init__(self, api_latency: float):
+        self.api_latency = api_latency
+        self.rest_calls = 0
+        self._snowflakes = itertools.count(10 ** 17)
+        self.channels = {}
+        self.scheduled_events = {}
+        self.guild = FakeGuild(self, GUILD_ID)
+
+    def snowflake(self) -> int:
+        return next(self._snowflakes)
+
+    async def call(self):
+        self.rest_calls += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    def get_channel(self, channel_id: int):
+        channel_id = int(channel_id)
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(self, channel_id)
+        return self.channels[channel_id]
+
+    def get_guild(self, guild_id: int):
+        return self.guild
+
+
+class FakeMessage:
+    def __init__(self, gateway: FakeGateway, channel, content: str, author):
+        self._gateway = gateway
+        self.id = gateway.snowflake()
+        self.channel = channel
+        self.content = content
+        self.author = author
+        self.guild = gateway.guild
+        self.created_at = datetime.now(timezone.utc)
+        self.reference = None
+
+    async def edit(self, **kwargs):
+        await self._gateway.call()
+        self.content = kwargs.get("content", self.content)
+
+    async def delete(self):
+        await self._gateway.call()
+
+    async def add_reaction(self, emoji):
+        await self._gateway.call()
+
+
+class FakeChannel:
+    def __init__(self, gateway: FakeGateway, channel_id: int):
+        self._gateway = gateway
+        self.id = channel_id
+        self.jump_url = f"https://discord.com/channels/{GUILD_ID}/{channel_id}"
+        self.messages = {}
+
+    def post(self, content: str, author) -> FakeMessage:
+        """Add a message to the channel without going through the bot."""
+        message = FakeMessage(self._gateway, self, content, author)
+        self.messages[message.id] = message
+        return message
+
+    async def send(self, content=None, **kwargs):
+        await self._gateway.call()
+        return self.post(content, BOT_USER)
+
+    async def fetch_message(self, message_id: int):
+        await self._gateway.call()
+        return self.messages[message_id]
+
+    def get_partial_message(self, message_id: int):
+        return self.messages[message_id]
+
+    async def edit(self, **kwargs):
+        await self._gateway.call()
+
+    async def create_thread(self, name: str, content: str):
+        await self._gateway.call()
+        thread = self._gateway.get_channel(self._gateway.snowflake())
+        return thread, thread.post(content, BOT_USER)
+
+    async def history(self, limit=100, oldest_first=False):
+        messages = list(self.messages.values())
+        if not oldest_first:
+            messages.reverse()
+        for i, message in enumerate(messages[:limit]):
+            if i % 100 == 0:
+                await self._gateway.call()
+            yield message
+
+
+class FakeGuild:
+    def __init__(self, gateway: FakeGateway, guild_id: int):
+        self._gateway = gateway
+        self.id = guild_id
+        self.emojis = [SimpleNamespace(name="keklaugh")]
+
+    async def create_scheduled_event(self, name, start_time, end_time, **kwargs):
+        # Like discord.py, which needs aware datetimes
+        if start_time.tzinfo is None or (end_time is not None and end_time.tzinfo is None):
+            raise ValueError("start_time and end_time must be aware datetimes")
+        await self._gateway.call()
+        event = SimpleNamespace(id=self._gateway.snowflake(), guild_id=self.id, name=name, start_time=start_time, end_time=end_time)
+        self._gateway.scheduled_events[event.id] = event
+        return event
+
+
+class FakeContext:
+    """What the app command handlers use as `ctx`."""
+
+    def __init__(self, gateway: FakeGateway, channel: FakeChannel, author, reference_id: int = None):
+        self._gateway = gateway
+        self.channel = channel
+        self.author = author
+        self.guild = gateway.guild
+        self.message = FakeMessage(gateway, channel, "", author)
+        if reference_id is not None:
+            self.message.reference = SimpleNamespace(message_id=reference_id)
+
+    async def send(self, content=None, **kwargs):
+        await self._gateway.call()
+
+
+class FakeInteraction:
+    """What the button callbacks receive."""
+
+    def __init__(self, gateway: FakeGateway, message: FakeMessage, user):
+        self.user = user
+        self.message = message
+        self.channel_id = message.channel.id
+        self.guild_id = gateway.guild.id
+        self.response = SimpleNamespace(
+            send_message=lambda *args, **kwargs: gateway.call(),
+            defer=lambda *args, **kwargs: gateway.call(),
+        )
+
+
+def make_user(user_id: int, moderator: bool = False):
+    roles = [SimpleNamespace(name="Moderator")] if moderator else []
+    return SimpleNamespace(id=user_id, name=f"user{user_id}", roles=roles)
+
+
+BOT_USER = make_user(BOT_USER_ID)
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Benchmark:
+    def __init__(self, gateway: FakeGateway, concurrency: int):
+        self.gateway = gateway
+        self.concurrency = concurrency
+        self.results = {}
+
+    async def measure(self, name: str, operations):
+        """
+        Run every operation with at most `concurrency` in flight, then wait for the sends they queued.
+
+        Args:
+            name (str): The workload name.
+            operations (list): Zero-argument callables returning the coroutine for one operation.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        latencies = []
+
+        async def run(operation):
+            async with semaphore:
+                start = time.perf_counter()
+                await operation()
+                latencies.append(time.perf_counter() - start)
+
+        round_trips_before = db_round_trips.value
+        rest_calls_before = self.gateway.rest_calls
+        start = time.perf_counter()
+        await asyncio.gather(*(run(operation) for operation in operations))
+        await mmbot.join_digest.flush_all()
+        await mmbot.outbound.drain()
+        elapsed = time.perf_counter() - start
+
+        count = len(operations) or 1
+        self.results[name] = {
+            "operations": len(operations),
+            "seconds": elapsed,
+            "throughput": len(operations) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.5) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "db_round_trips_per_op": (db_round_trips.value - round_trips_before) / count,
+            "rest_calls_per_op": (self.gateway.rest_calls - rest_calls_before) / count,
+        }
+
+    def report(self, baseline: dict = None):
+        header = f"{'workload':<14}{'ops':>8}{'ops/s':>11}{'p50 ms':>10}{'p99 ms':>10}{'db/op':>8}{'rest/op':>9}"
+        print(header)
+        print("-" * len(header))
+        for name, result in self.results.items():
+            line = (
+                f"{name:<14}{result['operations']:>8}{result['throughput']:>11.1f}{result['p50_ms']:>10.2f}"
+                f"{result['p99_ms']:>10.2f}{result['db_round_trips_per_op']:>8.2f}{result['rest_calls_per_op']:>9.2f}"
+            )
+            previous = (baseline or {}).get(name)
+            if previous and previous["throughput"]:
+                change = (result["throughput"] - previous["throughput"]) / previous["throughput"] * 100
+                line += f"   {change:+.1f}% ops/s vs baseline"
+            print(line)
+
+
+async def run_workloads(args) -> Benchmark:
+    rng = random.Random(args.seed)
+    gateway = FakeGateway(args.api_latency)
+    mmbot.bot.get_channel = gateway.get_channel
+    mmbot.bot.get_guild = gateway.get_guild
+    mmbot.db_pool = mmbot.ConnectionPool(
+        functools.partial(CountingConnection, mmbot.SQLITE_PATH),
+        size=mmbot.DB_POOL_SIZE,
+        max_overflow=mmbot.DB_POOL_MAX_OVERFLOW,
+        recycle=0,
+        pre_ping=False,
+    )
+    await mmbot.run_in_db(mmbot.apply_migrations, timeout=None)
+    await mmbot.warm_caches()
+
+    benchmark = Benchmark(gateway, args.concurrency)
+    general = gateway.get_channel(GENERAL_CHANNEL_ID)
+    users = [make_user(10_000 + i) for i in range(args.users)]
+    moderator = make_user(CHEESECAKE_USER_ID, moderator=True)
+
+    def createevent(i):
+        start = datetime.now() + timedelta(hours=rng.randint(1, 24 * 30))
+        return lambda: mmbot.createevent.callback(
+            FakeContext(gateway, general, rng.choice(users)),
+            f"Meetup {i}", f"Synthetic meetup number {i}",
+            start.strftime("%d/%m/%Y %H:%M"), (start + timedelta(hours=3)).strftime("%d/%m/%Y %H:%M"),
+            f"Venue {i % 50}",
+        )
+    await benchmark.measure("createevent", [createevent(i) for i in range(args.events)])
+
+    def approve(event):
+        async def operation():
+            view = mmbot.Event_Approval_Message(event)
+            message = gateway.get_channel(ADMIN_CHANNEL_ID).post("approval request", BOT_USER)
+            await view.button_callback.callback(FakeInteraction(gateway, message, moderator))
+            # Include the work done by the approval outbox
+            await mmbot.approval_outbox.wait(event.uuid)
+        return operation
+    await mmbot.approval_outbox.start([GUILD_ID])
+    pending = await mmbot.event_repository.get_by_status(mmbot.STATUS.PENDING)
+    await benchmark.measure("approve", [approve(event) for event in pending])
+
+    # Approvals queued before a restart, resumed with events read back from the database
+    for i in range(args.events // 10):
+        await createevent(args.events + i)()
+    resumed = await mmbot.event_repository.get_by_status(mmbot.STATUS.PENDING)
+    mmbot.approval_outbox.stop()
+    for event in resumed:
+        message = gateway.get_channel(ADMIN_CHANNEL_ID).post("approval request", BOT_USER)
+        await mmbot.Event_Approval_Message(event).button_callback.callback(FakeInteraction(gateway, message, moderator))
+    mmbot.approval_outbox = mmbot.ApprovalOutbox(
+        concurrency=mmbot.APPROVAL_CONCURRENCY, retry_delay=mmbot.APPROVAL_RETRY_DELAY, max_attempts=mmbot.APPROVAL_MAX_ATTEMPTS
+    )
+    mmbot.event_repository.invalidate()
+    await mmbot.approval_outbox.start([GUILD_ID])
+    await benchmark.measure("approve_resume", [functools.partial(mmbot.approval_outbox.wait, event.uuid) for event in resumed])
+    not_approved = [event.uuid for event in resumed if (await mmbot.event_repository.get(event.uuid)).status != mmbot.STATUS.APPROVED]
+    if not_approved:
+        raise RuntimeError(f"{len(not_approved)} resumed approvals failed")
+
+    scheduled_events = list(gateway.scheduled_events.values())
+    if scheduled_events:
+        await benchmark.measure("rsvp", [
+            functools.partial(mmbot.on_scheduled_event_user_add, rng.choice(scheduled_events), rng.choice(users))
+            for _ in range(args.rsvps)
+        ])
+
+    await benchmark.measure("mymeetups", [
+        functools.partial(mmbot.mymeetups.callback, FakeContext(gateway, general, rng.choice(users)))
+        for _ in range(args.lookups)
+    ])
+
+    approved = await mmbot.event_repository.get_by_status(mmbot.STATUS.APPROVED)
+    if approved:
+        await benchmark.measure("hypeman", [
+            functools.partial(mmbot.hypeman.callback, FakeContext(gateway, gateway.get_channel(event.event_forum_id), moderator))
+            for event in (rng.choice(approved) for _ in range(args.lookups))
+        ])
+
+    # Autocomplete for partially typed event names, which Discord only waits 3 seconds for
+    def autocomplete(i):
+        interaction = FakeInteraction(gateway, general.post("", moderator), rng.choice(users))
+        return functools.partial(mmbot.event_autocomplete, interaction, f"meet {rng.randint(1, args.events)}"[:rng.randint(2, 9)])
+    await benchmark.measure("autocomplete", [autocomplete(i) for i in range(args.lookups)])
+
+    # A burst of quotes where roughly one in five has already been quoted
+    quotable = [general.post(f"Something quotable number {i}", rng.choice(users)) for i in range(args.quotes)]
+    await benchmark.measure("quotethat", [
+        functools.partial(
+            mmbot.quotethat.callback,
+            FakeContext(gateway, general, rng.choice(users), reference_id=rng.choice(quotable[:max(1, len(quotable) * 4 // 5)]).id),
+        )
+        for _ in range(args.quotes)
+    ])
+
+    # A flame war: many people reporting a handful of messages at once
+    flamebait = [general.post(f"Something inflammatory number {i}", rng.choice(users)) for i in range(5)]
+    await benchmark.measure("report", [
+        functools.partial(mmbot.report.callback, FakeContext(gateway, general, rng.choice(users), reference_id=rng.choice(flamebait).id))
+        for _ in range(args.reports)
+    ])
+
+    quote_channel = gateway.get_channel(QUOTE_CHANNEL_ID)
+    posted_quotes = list(quote_channel.messages.values())
+    if posted_quotes:
+        await benchmark.measure("reaction", [
+            functools.partial(
+                mmbot.on_raw_reaction_add,
+                SimpleNamespace(
+                    guild_id=GUILD_ID, channel_id=QUOTE_CHANNEL_ID, message_id=rng.choice(posted_quotes).id,
+                    user_id=rng.choice(users).id, emoji="👍",
+                ),
+            )
+            for _ in range(args.reactions)
+        ])
+
+        await benchmark.measure("topquotes", [
+            functools.partial(mmbot.topquotes.callback, FakeInteraction(gateway, rng.choice(posted_quotes), rng.choice(users)))
+            for _ in range(args.lookups)
+        ])
+
+    return benchmark
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the bot")
+    parser.add_argument("--events", type=int, default=1000, help="events to create and approve")
+    parser.add_argument("--rsvps", type=int, default=10000, help="scheduled event RSVPs to deliver")
+    parser.add_argument("--users", type=int, default=2000, help="distinct synthetic users")
+    parser.add_argument("--lookups", type=int, default=1000, help="/mymeetups and /hypeman calls")
+    parser.add_argument("--quotes", type=int, default=500, help="/quotethat calls in the quote burst")
+    parser.add_argument("--reports", type=int, default=200, help="/report calls in the report burst")
+    parser.add_argument("--reactions", type=int, default=2000, help="quote reactions to deliver")
+    parser.add_argument("--concurrency", type=int, default=50, help="operations in flight at once")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="simulated seconds per Discord REST call")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the synthetic workload")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results previously written with --output")
+    args = parser.parse_args()
+
+    try:
+        benchmark = asyncio.run(run_workloads(args))
+    finally:
+        mmbot.db_executor.shutdown(wait=True)
+        mmbot.log_listener.stop()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    benchmark.report(baseline)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(benchmark.results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,405 @@
 import datetime
-from typing import List
+from typing import List, Literal
 import uuid
 import dataclasses
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import csv
+import email.utils
+import functools
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import json
+import math
+import queue
+import tempfile
+import threading
+import time
 import discord
-from discord.ext import commands
+import aiohttp
+from aiohttp import web
+from discord.ext import commands, tasks
 from discord import app_commands
 import logging
-from enum import Enum
+import logging.handlers
+from enum import Enum, IntEnum
 from dotenv import load_dotenv
 import os
-import mysql.connector
-from mysql.connector import Error
-from datetime import datetime, timedelta
+import re
+import sqlite3
+import zoneinfo
+try:
+    import mysql.connector
+except ImportError:
+    # Only needed when DB_BACKEND is mysql
+    mysql = None
+from datetime import datetime, timedelta, timezone
 
 
 # Load the .env file
 load_dotenv()
 
-# Get the variables
-GUILD_ID = int(os.getenv('GUILD_ID'))
-FORUM_CHANNEL_ID = int(os.getenv('FORUM_CHANNEL_ID'))
-ADMIN_CHANNEL_ID = int(os.getenv('ADMIN_CHANNEL_ID'))
+def optional_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+# Get the variables. Errors are reported to CHEESECAKE_USER_ID in BOT_CHANNEL_ID.
 CHEESECAKE_USER_ID = int(os.getenv('CHEESECAKE_USER_ID'))
 BOT_CHANNEL_ID = int(os.getenv('BOT_CHANNEL_ID'))
-QUOTE_CHANNEL_ID = int(os.getenv('QUOTE_CHANNEL_ID'))
 BOT_TOKEN = os.getenv('BOT_TOKEN')
-MOD_CHANNEL_ID = int(os.getenv('MOD_CHANNEL_ID'))
+
+# The home guild. Its configuration is created from these variables at startup, and rows from
+# before multi-guild support are assigned to it. Other guilds are configured with /setup.
+GUILD_ID = optional_int('GUILD_ID')
+FORUM_CHANNEL_ID = optional_int('FORUM_CHANNEL_ID')
+ADMIN_CHANNEL_ID = optional_int('ADMIN_CHANNEL_ID')
+QUOTE_CHANNEL_ID = optional_int('QUOTE_CHANNEL_ID')
+MOD_CHANNEL_ID = optional_int('MOD_CHANNEL_ID')
+
+# Sharding. Leave SHARD_COUNT unset to use the number Discord recommends. To split the shards
+# across processes, give every process the same SHARD_COUNT and its own SHARD_IDS, e.g. "0,1".
+SHARD_COUNT = optional_int('SHARD_COUNT')
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id.strip()] or None
+
+# Database backend, either "mysql" or "sqlite"
+DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'mmbot.db')
 
 host = os.getenv('DB_HOST', 'localhost')
 user = os.getenv('MYSQL_USER')
 password = os.getenv('MYSQL_PASSWORD')
 database = os.getenv('MYSQL_DATABASE')
 
+# Database pool settings
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 60 * 30))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+# Database executor settings
+DB_MAX_CONCURRENCY = int(os.getenv('DB_MAX_CONCURRENCY', DB_POOL_SIZE))
+DB_QUERY_TIMEOUT = float(os.getenv('DB_QUERY_TIMEOUT', 10))
+
+# Query result cache settings. Cached results are dropped when the tables they read are written,
+# or after QUERY_CACHE_TTL seconds at the latest.
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 300))
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 10000))
+
 
 # File names
 EVENTS_FILE_NAME = "events.pkl"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations", DB_BACKEND)
 
 # Time constants
 ONE_DAY_IN_SECONDS = 60 * 60 * 24
 
+# Event cache settings. Cached events are reloaded once they are older than this many seconds (0 = never).
+EVENT_CACHE_MAX_AGE = int(os.getenv('EVENT_CACHE_MAX_AGE', 60 * 10))
+
+# Quote settings
+QUOTE_BACKFILL_BATCH_SIZE = int(os.getenv('QUOTE_BACKFILL_BATCH_SIZE', 500))
+# Quotes are celebrated once they have QUOTE_CELEBRATION_THRESHOLD thumbs up. Changed scores are
+# written to the database every QUOTE_SCORE_FLUSH_INTERVAL seconds.
+QUOTE_CELEBRATION_THRESHOLD = int(os.getenv('QUOTE_CELEBRATION_THRESHOLD', 10))
+QUOTE_SCORE_FLUSH_INTERVAL = int(os.getenv('QUOTE_SCORE_FLUSH_INTERVAL', 30))
+
+# Report settings. Repeat reports within the window are added to the existing moderator post.
+REPORT_COALESCE_WINDOW = int(os.getenv('REPORT_COALESCE_WINDOW', 60 * 30))
+REPORT_EDIT_DELAY = int(os.getenv('REPORT_EDIT_DELAY', 5))
+
+# Reminders are posted in an approved event's thread this many hours before it starts.
+# The hypeman can be called from HYPEMAN_WINDOW_HOURS before the start.
+EVENT_REMINDER_HOURS = [float(hours) for hours in os.getenv('EVENT_REMINDER_HOURS', '72,1').split(',') if hours.strip()]
+HYPEMAN_WINDOW_HOURS = 72
+
+# Finished and rejected events are moved to events_archive EVENT_ARCHIVE_AFTER_DAYS after they end.
+# The job runs every EVENT_ARCHIVE_INTERVAL hours and moves EVENT_ARCHIVE_BATCH_SIZE events per transaction.
+EVENT_ARCHIVE_AFTER_DAYS = int(os.getenv('EVENT_ARCHIVE_AFTER_DAYS', 30))
+EVENT_ARCHIVE_INTERVAL = float(os.getenv('EVENT_ARCHIVE_INTERVAL', 24))
+EVENT_ARCHIVE_BATCH_SIZE = int(os.getenv('EVENT_ARCHIVE_BATCH_SIZE', 500))
+# Optionally archive and lock the forum threads of archived events, one every EVENT_ARCHIVE_THREAD_DELAY seconds
+ARCHIVE_EVENT_THREADS = os.getenv('ARCHIVE_EVENT_THREADS', 'false').lower() == 'true'
+EVENT_ARCHIVE_THREAD_DELAY = float(os.getenv('EVENT_ARCHIVE_THREAD_DELAY', 1))
+
+# Bulk event import. Approval requests for imported events are posted one every EVENT_IMPORT_POST_DELAY seconds.
+EVENT_IMPORT_MAX_ROWS = int(os.getenv('EVENT_IMPORT_MAX_ROWS', 500))
+EVENT_IMPORT_MAX_BYTES = int(os.getenv('EVENT_IMPORT_MAX_BYTES', 1024 * 1024))
+EVENT_IMPORT_POST_DELAY = float(os.getenv('EVENT_IMPORT_POST_DELAY', 1))
+
+# Approvals are carried out by a background worker, APPROVAL_CONCURRENCY at a time. A failed
+# approval is retried after APPROVAL_RETRY_DELAY seconds, doubling each time, up to APPROVAL_MAX_ATTEMPTS.
+APPROVAL_CONCURRENCY = int(os.getenv('APPROVAL_CONCURRENCY', 4))
+APPROVAL_RETRY_DELAY = float(os.getenv('APPROVAL_RETRY_DELAY', 30))
+APPROVAL_MAX_ATTEMPTS = int(os.getenv('APPROVAL_MAX_ATTEMPTS', 5))
+
+# How often, in minutes, the RSVP table is reconciled with Discord
+RSVP_SYNC_INTERVAL = int(os.getenv('RSVP_SYNC_INTERVAL', 60))
+
+# Join notices are collected per event thread and posted together after JOIN_DIGEST_DELAY seconds
+JOIN_DIGEST_DELAY = float(os.getenv('JOIN_DIGEST_DELAY', 30))
+JOIN_DIGEST_MAX_BATCH = int(os.getenv('JOIN_DIGEST_MAX_BATCH', 20))
+
+# Maximum number of calls to Discord in flight at once across all channels
+OUTBOUND_MAX_CONCURRENCY = int(os.getenv('OUTBOUND_MAX_CONCURRENCY', 10))
+
+# Command rate limits, as "command=uses/seconds" pairs, per user and per guild. A bucket holds up to
+# `uses` tokens and refills at `uses` per `seconds`, so short bursts are allowed.
+def parse_rate_limits(value: str) -> dict:
+    limits = {}
+    for pair in value.split(','):
+        if not pair.strip():
+            continue
+        command, rate = pair.split('=')
+        uses, seconds = rate.split('/')
+        limits[command.strip()] = (int(uses), float(seconds))
+    return limits
+
+USER_RATE_LIMITS = parse_rate_limits(os.getenv('USER_RATE_LIMITS', 'createevent=3/300,importevents=2/600,quotethat=5/60,report=5/60'))
+GUILD_RATE_LIMITS = parse_rate_limits(os.getenv('GUILD_RATE_LIMITS', 'createevent=30/300,importevents=10/600,quotethat=60/60,report=60/60'))
+# Commands are turned away while this many are already running, or while this many Discord calls are queued
+COMMAND_SHED_IN_FLIGHT = int(os.getenv('COMMAND_SHED_IN_FLIGHT', 100))
+COMMAND_SHED_OUTBOUND_DEPTH = int(os.getenv('COMMAND_SHED_OUTBOUND_DEPTH', 500))
+
+# Logging settings
+LOG_FILE_NAME = os.getenv('LOG_FILE_NAME', 'bot.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+
+# Error alerts. Repeats of the same error within the window are summarised in one message.
+ERROR_ALERT_WINDOW = int(os.getenv('ERROR_ALERT_WINDOW', 60))
+ERROR_ALERT_MAX_PER_WINDOW = int(os.getenv('ERROR_ALERT_MAX_PER_WINDOW', 5))
+
+# App command sync. Commands are only synced when their definitions change, unless forced.
+COMMAND_SYNC_SCOPE = os.getenv('COMMAND_SYNC_SCOPE', 'global').lower()
+FORCE_COMMAND_SYNC = os.getenv('FORCE_COMMAND_SYNC', 'false').lower() == 'true'
+
+# Embedded HTTP server, serving /metrics
+HTTP_HOST = os.getenv('HTTP_HOST', '0.0.0.0')
+HTTP_PORT = int(os.getenv('HTTP_PORT', 8080))
+
+# Calendar feeds are served at CALENDAR_BASE_URL/calendar/<guild id>.ics. With CALENDAR_FEED_SECRET
+# set, each feed URL carries a token derived from it, so only members given the URL can subscribe.
+CALENDAR_BASE_URL = os.getenv('CALENDAR_BASE_URL', f'http://localhost:{HTTP_PORT}').rstrip('/')
+CALENDAR_FEED_SECRET = os.getenv('CALENDAR_FEED_SECRET', '')
+CALENDAR_FEED_MAX_AGE = int(os.getenv('CALENDAR_FEED_MAX_AGE', 300))
+
+# Gateway intents, either "minimal" or "full". The minimal profile does not receive or cache the
+# member list, members are fetched when needed and the most recent MEMBER_CACHE_SIZE are kept.
+INTENT_PROFILE = os.getenv('INTENT_PROFILE', 'minimal').lower()
+MEMBER_CACHE_SIZE = int(os.getenv('MEMBER_CACHE_SIZE', 1000))
+
 # Bot settings
-intents = discord.Intents.all()
+if INTENT_PROFILE == "full":
+    intents = discord.Intents.all()
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+else:
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.guild_reactions = True
+    intents.emojis_and_stickers = True
+    intents.guild_scheduled_events = True
+    member_cache_flags = discord.MemberCacheFlags.none()
 intents.message_content = True
-intents.guild_scheduled_events = True
 
-# Create the bot
-class MMBot(commands.Bot):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.tree = app_commands.CommandTree(self)
+# Set while the outbound queue makes a call, which it times itself, queueing delay included
+in_outbound_call = contextvars.ContextVar("in_outbound_call", default=False)
 
+def discord_route(method: str, path: str) -> str:
+    """Name a REST request by its route, e.g. "POST /channels/{id}/messages", leaving out ids and tokens."""
+    segments = re.sub(r"^/api/v\d+", "", path).split("/")
+    for i, segment in enumerate(segments):
+        if segment.isdigit():
+            segments[i] = "{id}"
+        elif i >= 2 and segments[i - 1] == "{id}" and segments[i - 2] in ("interactions", "webhooks"):
+            segments[i] = "{token}"
+    return f"{method} {'/'.join(segments)}"
+
+def discord_http_trace() -> aiohttp.TraceConfig:
+    """
+    Time the REST requests made outside the outbound queue, such as interaction responses,
+    message deletes and fetches, with the same metrics as queued calls and a priority of "direct".
+    """
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+
+    def record(context, params, failed: bool):
+        if in_outbound_call.get() or not params.url.path.startswith("/api/"):
+            return
+        labels = {"call": discord_route(params.method, params.url.path), "priority": "direct"}
+        if failed:
+            DISCORD_CALL_ERRORS.inc(**labels)
+        DISCORD_CALL_LATENCY.observe(time.perf_counter() - context.start, **labels)
+
+    async def on_request_end(session, context, params):
+        record(context, params, failed=params.response.status >= 400)
+
+    async def on_request_exception(session, context, params):
+        record(context, params, failed=True)
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+class MMCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Turn commands away, with an ephemeral reply, when they are rate limited or the bot is overloaded."""
+        # Autocomplete is answered from memory and is never limited
+        if interaction.type is not discord.InteractionType.application_command or interaction.command is None:
+            return True
+        reason = command_limiter.check(interaction.command.qualified_name, interaction.user.id, interaction.guild_id)
+        if reason is None:
+            return True
+        with contextlib.suppress(discord.HTTPException):
+            await interaction.response.send_message(reason, ephemeral=True)
+        return False
+
+# Create the bot
+class MMBot(commands.AutoShardedBot):
     async def setup_hook(self):
-        await self.tree.sync()
+        self.http_runner = await start_http_server()
+        self.loop_lag_task = asyncio.create_task(measure_event_loop_lag())
+        self.install_scheduled_event_user_parsers()
+        await run_in_db(apply_migrations, timeout=None)
+        try:
+            await warm_caches()
+        except Error as e:
+            logger.error(f"Could not warm the caches: {e}")
+        await self.sync_commands(force=FORCE_COMMAND_SYNC)
 
-bot = MMBot(command_prefix="/", intents=intents)
+    async def sync_commands(self, force: bool = False):
+        """
+        Sync the app commands with Discord if they have changed since the last sync.
+
+        With COMMAND_SYNC_SCOPE=guild the commands are registered to the home guild GUILD_ID only,
+        which takes effect immediately, instead of globally. Any global commands left from an
+        earlier global sync are removed at the same time, so they are not listed twice.
+
+        Args:
+            force (bool): Sync even if the commands look unchanged.
+        """
+        guild = discord.Object(GUILD_ID) if COMMAND_SYNC_SCOPE == "guild" and GUILD_ID else None
+        if guild is not None:
+            self.tree.copy_global_to(guild=guild)
+
+        fingerprint = command_tree_fingerprint(self.tree, guild)
+        if not force and await read_command_fingerprint() == fingerprint:
+            log_info("App commands unchanged, skipping sync")
+            return
+
+        await self.tree.sync(guild=guild)
+        if guild is not None:
+            # The commands were copied to the guild above, so this only unregisters the global ones
+            self.tree.clear_commands(guild=None)
+            await self.tree.sync()
+        await write_command_fingerprint(fingerprint)
+        log_info("Synced app commands ({})".format(COMMAND_SYNC_SCOPE))
+
+    def install_scheduled_event_user_parsers(self):
+        """
+        Dispatch scheduled event joins and leaves for users that are not in the cache.
+
+        discord.py drops these events when it does not know the user, which without the member
+        list is most of them. The handlers only need the user's id, so the event is dispatched
+        with a `discord.Object` instead.
+        """
+        parsers = self._connection.parsers
+        for gateway_event, event_name in (
+            ("GUILD_SCHEDULED_EVENT_USER_ADD", "scheduled_event_user_add"),
+            ("GUILD_SCHEDULED_EVENT_USER_REMOVE", "scheduled_event_user_remove"),
+        ):
+            parsers[gateway_event] = functools.partial(self._parse_scheduled_event_user, parsers[gateway_event], event_name)
+
+    def _parse_scheduled_event_user(self, parser, event_name: str, data: dict):
+        state = self._connection
+        user_id = int(data["user_id"])
+        guild = state._get_guild(int(data["guild_id"]))
+        scheduled_event = guild.get_scheduled_event(int(data["guild_scheduled_event_id"])) if guild is not None else None
+        if state.get_user(user_id) is not None or scheduled_event is None:
+            parser(data)
+        else:
+            self.dispatch(event_name, scheduled_event, discord.Object(user_id))
+
+    async def close(self):
+        # Announce any buffered joins and finish queued sends while the connection is still open
+        event_scheduler.stop()
+        approval_outbox.stop()
+        approval_posts.stop()
+        await join_digest.flush_all()
+        try:
+            await quote_scores.flush()
+        except Error as e:
+            logger.error(f"Could not save quote scores: {e}")
+        error_alerts.flush()
+        await outbound.drain(timeout=30)
+        await super().close()
+        self.loop_lag_task.cancel()
+        await self.http_runner.cleanup()
+        db_executor.shutdown(wait=True)
+        db_pool.dispose()
+        log_listener.stop()
+
+bot = MMBot(
+    command_prefix="/",
+    tree_cls=MMCommandTree,
+    http_trace=discord_http_trace(),
+    intents=intents,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS,
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=INTENT_PROFILE == "full",
+)
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
 
 # Create a logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Create a file handler
-handler = logging.FileHandler('bot.log')
+# Create a size-rotated file handler
+if os.path.dirname(LOG_FILE_NAME):
+    os.makedirs(os.path.dirname(LOG_FILE_NAME), exist_ok=True)
+handler = logging.handlers.RotatingFileHandler(LOG_FILE_NAME, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
 handler.setLevel(logging.INFO)
 
 # Create a logging format
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
+handler.setFormatter(JsonFormatter())
+
+# Records are handed to a background thread so file writes never block the event loop
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+log_listener.start()
 
 # Add the handlers to the logger
-logger.addHandler(handler)
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+class STATUS(Enum):
+    PENDING = "PENDING"
+    APPROVED = "APPROVED"
+    REJECTED = "REJECTED"
+    FINISHED = "FINISHED"
 
 @dataclasses.dataclass
 class Event:
@@ -85,11 +416,403 @@ class Event:
     event_forum_url: str = ""
     event_forum_id: str = ""
     hypeman_used: bool = False
+    status: STATUS = STATUS.PENDING
+    guild_id: int = 0
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
 
-class STATUS(Enum):
-    PENDING = "PENDING"
-    APPROVED = "APPROVED"
-    REJECTED = "REJECTED"
+class Metric:
+    """Base class for metrics exported in the Prometheus text format."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), function=None):
+        """
+        Args:
+            name (str): The metric name.
+            documentation (str): The help text.
+            labelnames (tuple): The names of the labels the metric is broken down by.
+            function (callable): If given, called at scrape time to read the value instead of
+                tracking it here. It may return a single value or a dict keyed by label values.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+        metrics_registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self):
+        """Yield (suffix, labels, value) for every sample of the metric."""
+        values = self.function() if self.function is not None else dict(self._values)
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            key = key if isinstance(key, tuple) else (key,)
+            yield "", dict(zip(self.labelnames, key)), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {value}")
+        return lines
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+class Histogram(Metric):
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            buckets, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    buckets[i] += 1
+            self._values[key] = (buckets, total + value, count + 1)
+
+    def _samples(self):
+        for key, (buckets, total, count) in list(self._values.items()):
+            labels = dict(zip(self.labelnames, key))
+            for bound, bucket_count in zip(self.buckets, buckets):
+                yield "_bucket", {**labels, "le": bound}, bucket_count
+            yield "_bucket", {**labels, "le": "+Inf"}, count
+            yield "_sum", labels, total
+            yield "_count", labels, count
+
+metrics_registry = []
+
+def render_metrics() -> str:
+    lines = []
+    for metric in metrics_registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+COMMAND_LATENCY = Histogram("mmbot_command_duration_seconds", "Time taken to handle an app command", ["command"])
+COMMAND_ERRORS = Counter("mmbot_command_errors_total", "App commands that raised an exception", ["command"])
+BUTTON_LATENCY = Histogram("mmbot_button_duration_seconds", "Time taken to handle a button click", ["button"])
+BUTTON_ERRORS = Counter("mmbot_button_errors_total", "Button callbacks that raised an exception", ["button"])
+DB_QUERY_LATENCY = Histogram("mmbot_db_query_duration_seconds", "Time taken by a database query, including waiting for the executor", ["helper"])
+DB_QUERY_ERRORS = Counter("mmbot_db_query_errors_total", "Database queries that failed or timed out", ["helper"])
+QUERY_CACHE_LOOKUPS = Counter("mmbot_query_cache_lookups_total", "Cached read helper calls by whether the result was cached", ["helper", "result"])
+DISCORD_CALL_LATENCY = Histogram("mmbot_discord_call_duration_seconds", "Time from queueing a Discord call to its completion", ["call", "priority"])
+DISCORD_CALL_ERRORS = Counter("mmbot_discord_call_errors_total", "Discord calls that failed", ["call", "priority"])
+EVENT_LOOP_LAG = Gauge("mmbot_event_loop_lag_seconds", "How late the last event loop lag probe woke up")
+
+def timed(histogram: Histogram, errors: Counter, **labels):
+    """
+    Record how long a coroutine function takes, and count the exceptions it raises.
+
+    The wrapper keeps the signature of the wrapped function, so it can be used underneath
+    `bot.tree.command` and `discord.ui.button`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def timed_command(name: str):
+    """Time an app command, and count it as running while the command limiter decides whether to shed load."""
+    timer = timed(COMMAND_LATENCY, COMMAND_ERRORS, command=name)
+    def decorator(func):
+        timed_func = timer(func)
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            command_limiter.in_flight += 1
+            try:
+                return await timed_func(*args, **kwargs)
+            finally:
+                command_limiter.in_flight -= 1
+        return wrapper
+    return decorator
+
+def timed_button(name: str):
+    return timed(BUTTON_LATENCY, BUTTON_ERRORS, button=name)
+
+COMMANDS_RATE_LIMITED = Counter("mmbot_commands_rate_limited_total", "App commands turned away by a rate limit", ["command", "scope"])
+COMMANDS_SHED = Counter("mmbot_commands_shed_total", "App commands turned away because the bot was overloaded", ["command"])
+
+class CommandLimiter:
+    """
+    Decides whether an app command may run, before any of its work is done.
+
+    Commands are shed while `shed_in_flight` commands are already running or `shed_outbound_depth`
+    Discord calls are queued. Otherwise the command takes a token from its user's and its guild's
+    bucket, when it has a limit for that scope. Buckets are refilled lazily when they are checked,
+    and buckets that are full again are dropped once there are more than `max_buckets`.
+    """
+
+    def __init__(self, user_limits: dict, guild_limits: dict, shed_in_flight: int, shed_outbound_depth: int, max_buckets: int = 10000):
+        self.limits = {"user": user_limits, "guild": guild_limits}
+        self.shed_in_flight = shed_in_flight
+        self.shed_outbound_depth = shed_outbound_depth
+        self.max_buckets = max_buckets
+        self.in_flight = 0
+        # (command, scope, id) -> [tokens, last refill]
+        self._buckets = {}
+
+    def check(self, command: str, user_id: int, guild_id: int = None):
+        """
+        Returns:
+            str: None if the command may run, otherwise the reason it was turned away.
+        """
+        if self.in_flight >= self.shed_in_flight or outbound.depth >= self.shed_outbound_depth:
+            COMMANDS_SHED.inc(command=command)
+            return "The bot is busy right now, please try again in a moment."
+
+        now = time.monotonic()
+        buckets = []
+        for scope, key in (("user", user_id), ("guild", guild_id)):
+            limit = self.limits[scope].get(command)
+            if limit is None or key is None:
+                continue
+            uses, seconds = limit
+            bucket = self._buckets.get((command, scope, key))
+            if bucket is None:
+                bucket = self._buckets[(command, scope, key)] = [uses, now]
+            bucket[0] = min(uses, bucket[0] + (now - bucket[1]) * uses / seconds)
+            bucket[1] = now
+            if bucket[0] < 1:
+                COMMANDS_RATE_LIMITED.inc(command=command, scope=scope)
+                retry_after = math.ceil((1 - bucket[0]) * seconds / uses)
+                if scope == "user":
+                    return f"You're using /{command} too often, please try again in {retry_after} seconds."
+                return f"/{command} is being used a lot in this server, please try again in {retry_after} seconds."
+            buckets.append(bucket)
+
+        # Only take tokens once every bucket has one, so a guild limit doesn't use up the user's
+        for bucket in buckets:
+            bucket[0] -= 1
+        if len(self._buckets) > self.max_buckets:
+            self._prune(now)
+        return None
+
+    def _prune(self, now: float):
+        for (command, scope, key), (tokens, updated) in list(self._buckets.items()):
+            uses, seconds = self.limits[scope][command]
+            if tokens + (now - updated) * uses / seconds >= uses:
+                del self._buckets[(command, scope, key)]
+
+command_limiter = CommandLimiter(
+    USER_RATE_LIMITS, GUILD_RATE_LIMITS,
+    shed_in_flight=COMMAND_SHED_IN_FLIGHT, shed_outbound_depth=COMMAND_SHED_OUTBOUND_DEPTH
+)
+
+# The DB helper currently running, used to label query metrics
+current_db_helper = contextvars.ContextVar("current_db_helper", default=None)
+
+def db_helper(func):
+    """Label the queries made by a database helper with the helper's name."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_db_helper.set(func.__qualname__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_db_helper.reset(token)
+    return wrapper
+
+class PRIORITY(IntEnum):
+    """Outbound send priorities. Lower values are sent first within a route."""
+    MODERATION = 0
+    APPROVAL = 1
+    DEFAULT = 2
+    NOTICE = 3
+    REACTION = 4
+    MAINTENANCE = 5
+
+def channel_route(channel_id: int):
+    return ("channel", int(channel_id))
+
+def guild_route(guild_id: int):
+    return ("guild", int(guild_id))
+
+class OutboundQueue:
+    """
+    The single path for messages, edits and other calls the bot makes to Discord.
+
+    Calls are queued per route (normally a channel) and each route is drained by its own worker,
+    highest priority first, so a route stuck in rate-limit backoff only delays its own traffic.
+    At most `max_concurrency` calls are in flight across all routes. When every slot is taken,
+    freed slots go to the highest priority call waiting on any route.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._slots_used = 0
+        # (priority, sequence, future) for calls waiting for a slot
+        self._waiters = []
+        self._routes = {}
+        self._workers = {}
+        self._sequence = itertools.count()
+        self._latencies = collections.deque(maxlen=1000)
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+
+    def submit(self, route, factory, priority: PRIORITY = PRIORITY.DEFAULT, background: bool = False, call: str = "call") -> asyncio.Future:
+        """
+        Queue a call to Discord.
+
+        Args:
+            route: The rate-limit bucket the call belongs to, see `channel_route` and `guild_route`.
+            factory (callable): Called with no arguments to create the coroutine that makes the call.
+            priority (PRIORITY): Where the call goes in its route's queue.
+            background (bool): Nobody will await the result, so failures are logged here instead.
+            call (str): What kind of call this is, used to label metrics.
+
+        Returns:
+            asyncio.Future: Resolves to the result of the call. Await it if the result is needed.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if background:
+            future.add_done_callback(functools.partial(self._log_failure, route))
+        route_queue = self._routes.setdefault(route, asyncio.PriorityQueue())
+        route_queue.put_nowait((priority, next(self._sequence), time.monotonic(), call, factory, future))
+        if route not in self._workers:
+            self._workers[route] = asyncio.create_task(self._drain(route))
+        return future
+
+    def send(self, channel_id: int, *args, priority: PRIORITY = PRIORITY.DEFAULT, background: bool = True, **kwargs) -> asyncio.Future:
+        """Queue `bot.get_channel(channel_id).send(*args, **kwargs)`."""
+        return self.submit(
+            channel_route(channel_id),
+            lambda: bot.get_channel(channel_id).send(*args, **kwargs),
+            priority=priority,
+            background=background,
+            call="send",
+        )
+
+    @property
+    def depth(self) -> int:
+        return sum(route_queue.qsize() for route_queue in self._routes.values())
+
+    def status(self) -> dict:
+        """Return the queue depth, throughput counters and send latency percentiles in seconds."""
+        latencies = sorted(self._latencies)
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+        return {
+            "depth": self.depth,
+            "routes": len(self._routes),
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "latency_p50": percentile(0.5),
+            "latency_p99": percentile(0.99),
+        }
+
+    async def drain(self, timeout: float = None):
+        """Wait for everything queued so far to be sent."""
+        workers = list(self._workers.values())
+        if workers:
+            await asyncio.wait(workers, timeout=timeout)
+
+    async def _drain(self, route):
+        route_queue = self._routes[route]
+        try:
+            while not route_queue.empty():
+                priority, sequence, queued_at, call, factory, future = route_queue.get_nowait()
+                if future.cancelled():
+                    continue
+                labels = {"call": call, "priority": PRIORITY(priority).name.lower()}
+                await self._acquire_slot(priority, sequence)
+                self.in_flight += 1
+                token = in_outbound_call.set(True)
+                try:
+                    result = await factory()
+                except Exception as e:
+                    self.failed += 1
+                    DISCORD_CALL_ERRORS.inc(**labels)
+                    future.set_exception(e)
+                else:
+                    self.sent += 1
+                    future.set_result(result)
+                finally:
+                    in_outbound_call.reset(token)
+                    self.in_flight -= 1
+                    self._release_slot()
+                latency = time.monotonic() - queued_at
+                self._latencies.append(latency)
+                DISCORD_CALL_LATENCY.observe(latency, **labels)
+        finally:
+            del self._workers[route]
+            del self._routes[route]
+
+    async def _acquire_slot(self, priority: int, sequence: int):
+        """Wait for a free slot. Waiting calls get slots in priority order, then in the order they were queued."""
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        if self._slots_used < self.max_concurrency and not self._waiters:
+            self._slots_used += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, sequence, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation
+                self._release_slot()
+            raise
+
+    def _release_slot(self):
+        """Hand the slot to the highest priority waiting call, or free it if nothing is waiting."""
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._slots_used -= 1
+
+    def _log_failure(self, route, future: asyncio.Future):
+        if future.cancelled() or future.exception() is None:
+            return
+        message = f"Outbound call to {route[0]} {route[1]} failed: {future.exception()}"
+        if route == channel_route(BOT_CHANNEL_ID):
+            # Don't try to report a failure to reach the bot channel to the bot channel
+            logger.error(message)
+        else:
+            log_error(message)
+
+outbound = OutboundQueue(max_concurrency=OUTBOUND_MAX_CONCURRENCY)
 
 def log_info(message):
     """
@@ -100,67 +823,565 @@ def log_info(message):
     """
     logger.info(message)
 
-async def log_error(message):
+def log_error(message):
     """
-    Log an error message and send a notification to the bot channel.
+    Log an error message and alert the bot channel.
+
+    Alerts are deduplicated by `ErrorAlerts`, so this is safe to call from a tight loop.
 
     Args:
         message (str): The message to log.
     """
-    await bot.get_channel(BOT_CHANNEL_ID).send(f"User <@{CHEESECAKE_USER_ID}> there's been an error: {message}")
     logger.error(message)
-    
-    
-def get_event_from_channel_id(channel_id: str):
-    try:
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
+    error_alerts.report(message)
 
-        cursor = connection.cursor()
+def error_fingerprint(message: str) -> str:
+    """Group error messages that only differ by ids, counts or timestamps."""
+    return re.sub(r"\d+", "#", message)[:200]
 
-        # Prepare the SQL query
-        select_query = """
-            SELECT uuid, name, description, start_time, end_time, location, op_id, op_name, original_channel_id, event_id, event_forum_url, event_forum_id, hypeman_used
-            FROM events
-            WHERE event_forum_id = %s
+@dataclasses.dataclass
+class ErrorCount:
+    message: str
+    count: int = 0
+    alerted: bool = False
+
+class ErrorAlerts:
+    """
+    Rate-limited error alerts for the bot channel.
+
+    The first `max_alerts` distinct errors in a window are posted straight away. Everything else
+    is counted by fingerprint and posted as a single summary when the window closes, e.g.
+    "12 occurrences in the last minute".
+    """
+
+    def __init__(self, window: int, max_alerts: int):
+        self.window = window
+        self.max_alerts = max_alerts
+        self._errors = {}
+        self._alerts_sent = 0
+        self._flush_task = None
+
+    def report(self, message: str):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Nothing to post with before the bot is running; the error is still in the log
+            return
+
+        error = self._errors.setdefault(error_fingerprint(message), ErrorCount(message))
+        error.count += 1
+        if not error.alerted and self._alerts_sent < self.max_alerts:
+            error.alerted = True
+            self._alerts_sent += 1
+            outbound.send(BOT_CHANNEL_ID, f"User <@{CHEESECAKE_USER_ID}> there's been an error: {message}")
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        self.flush()
+
+    def flush(self):
+        """Post a summary of the errors that were not alerted individually and start a new window."""
+        errors, self._errors, self._alerts_sent = self._errors, {}, 0
+        lines = []
+        for error in errors.values():
+            unreported = error.count - (1 if error.alerted else 0)
+            if unreported:
+                lines.append(f"- {error.message}: {unreported} occurrences in the last {format_seconds(self.window)}")
+        if lines:
+            summary = f"User <@{CHEESECAKE_USER_ID}> errors are repeating:\n" + "\n".join(lines)
+            outbound.send(BOT_CHANNEL_ID, summary[:2000])
+
+def format_seconds(seconds: int) -> str:
+    if seconds == 60:
+        return "minute"
+    if seconds % 60 == 0:
+        return f"{seconds // 60} minutes"
+    return f"{seconds} seconds"
+
+error_alerts = ErrorAlerts(window=ERROR_ALERT_WINDOW, max_alerts=ERROR_ALERT_MAX_PER_WINDOW)
+
+
+class DatabaseError(Exception):
+    """Base class for errors raised by the bot's own database layer."""
+
+# Every database error the helpers handle, whichever backend is in use
+Error = (DatabaseError, sqlite3.Error) + ((mysql.connector.Error,) if mysql is not None else ())
+
+
+class PoolTimeoutError(DatabaseError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+@dataclasses.dataclass
+class PoolStats:
+    checkouts: int = 0
+    wait_time: float = 0.0
+    connections_created: int = 0
+    connections_recycled: int = 0
+    connections_invalidated: int = 0
+
+
+@dataclasses.dataclass
+class _PooledConnection:
+    connection: object
+    created_at: float
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of database connections shared by every DB helper.
+
+    Up to `size` connections are kept open between checkouts. When they are all in use, up to
+    `max_overflow` extra connections are opened and closed again on check-in. Idle connections
+    older than `recycle` seconds are replaced, and if `pre_ping` is set every checkout is
+    health-checked with a cheap query before it is handed out.
+    """
+
+    def __init__(self, creator, size=5, max_overflow=10, recycle=1800, timeout=30, pre_ping=True):
+        """
+        Args:
+            creator (callable): Opens and returns a new DB-API connection.
+            size (int): The number of connections kept open while idle.
+            max_overflow (int): How many connections may be opened on top of `size`.
+            recycle (int): Replace connections older than this many seconds. 0 disables recycling.
+            timeout (int): How long to wait for a free connection before giving up.
+            pre_ping (bool): Health-check connections with `SELECT 1` on checkout.
         """
+        self._creator = creator
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        # Used as a stack, so the most recently returned connection is reused first
+        self._idle = []
+        self._lock = threading.Lock()
+        # Notified whenever a connection is returned or closed, so waiters can take it or open a new one
+        self._available = threading.Condition(self._lock)
+        self._open = 0
+        self.stats = PoolStats()
+
+    @property
+    def checked_out(self) -> int:
+        return self._open - len(self._idle)
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def status(self) -> dict:
+        """Return the pool statistics along with the current pool occupancy."""
+        with self._lock:
+            status = dataclasses.asdict(self.stats)
+        status.update(open=self._open, idle=self.idle, checked_out=self.checked_out)
+        return status
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Check a connection out of the pool for the duration of a `with` block.
 
-        # Execute the query to get the event by channel_id
-        cursor.execute(select_query, (channel_id,))
+        Any transaction left open by the block is rolled back when the connection is returned,
+        so callers must commit their own writes.
+        """
+        pooled = self._checkout()
+        try:
+            yield pooled.connection
+        finally:
+            self._checkin(pooled)
+
+    def dispose(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+    def _checkout(self) -> _PooledConnection:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            pooled = self._wait_for_connection(deadline)
+            if pooled is None:
+                pooled = self._create()
+            if self._is_usable(pooled):
+                with self._lock:
+                    self.stats.checkouts += 1
+                    self.stats.wait_time += time.monotonic() - start
+                return pooled
+
+    def _checkin(self, pooled: _PooledConnection):
+        try:
+            pooled.connection.rollback()
+        except Exception:
+            with self._lock:
+                self.stats.connections_invalidated += 1
+            self._discard(pooled)
+            return
+        with self._available:
+            if len(self._idle) < self.size:
+                self._idle.append(pooled)
+                self._available.notify()
+                return
+        self._discard(pooled)
 
-        # Fetch all the matching records
-        rows = cursor.fetchall()
+    def _wait_for_connection(self, deadline: float):
+        """
+        Take an idle connection, or reserve a slot for a new one and return None.
 
-        # Convert rows to list of Event instances
-        events = [Event(*row) for row in rows]
+        Waits until a connection is returned or closed if the pool is full.
+        """
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"Timed out after {self.timeout}s waiting for a database connection")
+                self._available.wait(remaining)
+
+    def _create(self):
+        """Open a connection in a slot reserved by `_wait_for_connection`."""
+        try:
+            connection = self._creator()
+        except Exception:
+            with self._available:
+                self._open -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self.stats.connections_created += 1
+        return _PooledConnection(connection, time.monotonic())
+
+    def _is_usable(self, pooled: _PooledConnection) -> bool:
+        if self.recycle and time.monotonic() - pooled.created_at > self.recycle:
+            with self._lock:
+                self.stats.connections_recycled += 1
+            self._discard(pooled)
+            return False
+        if self.pre_ping:
+            try:
+                cursor = pooled.connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                cursor.close()
+            except Exception:
+                with self._lock:
+                    self.stats.connections_invalidated += 1
+                self._discard(pooled)
+                return False
+        return True
+
+    def _discard(self, pooled: _PooledConnection):
+        with self._available:
+            self._open -= 1
+            self._available.notify()
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
 
-        # Return only the first event
-        return events[0]
 
-    except Error as e:
-        log_error(f"Error: {e}")
-        return None
+# SQLite stores datetimes the way mysql-connector sends them: local wall time without a timezone,
+# so aware datetimes are converted to naive local time, the way they are read back
+sqlite3.register_adapter(datetime, lambda dt: _naive_local(dt).isoformat(" "))
+sqlite3.register_converter("DATETIME", lambda value: datetime.fromisoformat(value.decode()))
+
+@functools.lru_cache(maxsize=256)
+def sqlite_query(query: str) -> str:
+    """Translate the MySQL flavoured SQL used by the helpers into SQLite."""
+    return query.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, params=()):
+        self._cursor.execute(sqlite_query(query), params)
+
+    def executemany(self, query: str, rows):
+        self._cursor.executemany(sqlite_query(query), rows)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    """
+    An embedded SQLite database that behaves like a mysql-connector connection.
+
+    The database runs in WAL mode so readers never block the writer, and each connection keeps
+    a cache of prepared statements, so repeated helper queries skip parsing and planning.
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(
+            path,
+            timeout=DB_POOL_TIMEOUT,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self._connection.cursor())
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+def create_db_pool() -> ConnectionPool:
+    """Create the connection pool for the backend selected by DB_BACKEND."""
+    if DB_BACKEND == "sqlite":
+        # Local connections don't go stale, so there is nothing to recycle or ping
+        return ConnectionPool(
+            functools.partial(SQLiteConnection, SQLITE_PATH),
+            size=DB_POOL_SIZE,
+            max_overflow=DB_POOL_MAX_OVERFLOW,
+            recycle=0,
+            timeout=DB_POOL_TIMEOUT,
+            pre_ping=False,
+        )
+    if DB_BACKEND != "mysql":
+        raise ValueError(f"Unknown DB_BACKEND {DB_BACKEND!r}, expected mysql or sqlite")
+    if mysql is None:
+        raise ImportError("DB_BACKEND is mysql but mysql-connector-python is not installed")
+    return ConnectionPool(
+        functools.partial(mysql.connector.connect, host=host, user=user, password=password, database=database),
+        size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_MAX_OVERFLOW,
+        recycle=DB_POOL_RECYCLE,
+        timeout=DB_POOL_TIMEOUT,
+        pre_ping=DB_POOL_PRE_PING,
+    )
+
+db_pool = create_db_pool()
+
+
+class QueryTimeoutError(DatabaseError):
+    """Raised when a query does not finish within DB_QUERY_TIMEOUT."""
+
+
+# Blocking database work runs here so it never stalls the event loop
+db_executor = concurrent.futures.ThreadPoolExecutor(max_workers=DB_MAX_CONCURRENCY, thread_name_prefix="db")
+_db_semaphore = asyncio.Semaphore(DB_MAX_CONCURRENCY)
+
+
+async def run_in_db(func, *args, timeout: float = DB_QUERY_TIMEOUT):
+    """
+    Run a blocking database function on the DB executor and await its result.
+
+    At most DB_MAX_CONCURRENCY calls run at once; the rest wait their turn. The timeout covers
+    both the wait and the query itself.
+
+    Args:
+        func (callable): The blocking function to run. It is called as `func(*args)`.
+        timeout (float): Seconds to wait before raising QueryTimeoutError.
+
+    Returns:
+        The return value of `func`.
+    """
+    async def _run():
+        async with _db_semaphore:
+            return await asyncio.get_running_loop().run_in_executor(db_executor, func, *args)
 
+    helper = current_db_helper.get() or getattr(func, "__name__", "unknown")
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(_run(), timeout)
+    except asyncio.TimeoutError:
+        DB_QUERY_ERRORS.inc(helper=helper)
+        raise QueryTimeoutError(f"Query {getattr(func, '__name__', func)} timed out after {timeout}s")
+    except Exception:
+        DB_QUERY_ERRORS.inc(helper=helper)
+        raise
     finally:
-        if connection.is_connected():
+        DB_QUERY_LATENCY.observe(time.perf_counter() - start, helper=helper)
+
+
+def _query(query: str, params: tuple, fetch: bool):
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            if fetch:
+                return cursor.fetchall()
+            connection.commit()
+            return cursor.rowcount
+        finally:
             cursor.close()
-            connection.close()
 
+
+async def db_fetch(query: str, params: tuple = ()) -> list:
+    """Run a SELECT off the event loop and return all of its rows."""
+    return await run_in_db(_query, query, params, True)
+
+
+async def db_execute(query: str, params: tuple = ()) -> int:
+    """Run a write statement off the event loop, commit it and return the affected row count."""
+    return await run_in_db(_query, query, params, False)
+
+
+def _query_many(query: str, rows: List[tuple]):
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(query, rows)
+            connection.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+
+async def db_execute_many(query: str, rows: List[tuple]) -> int:
+    """Run a write statement once per row in a single transaction and return the affected row count."""
+    return await run_in_db(_query_many, query, rows)
+
+
+class QueryCache:
+    """
+    Results of read helpers, keyed by the helper and its arguments.
+
+    Each entry remembers the version of every table it was read from, per guild. Write helpers bump
+    those versions with `invalidate`, which makes older entries stale without having to find them.
+    The versions are read before the query runs, so a write that lands while a read is in flight
+    also invalidates that read's result. Entries expire after `ttl` seconds, and the least recently
+    used are evicted beyond `max_size`. Results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        # (table, guild id) -> version
+        self._versions = collections.defaultdict(int)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, table: str, guild_id: int):
+        self._versions[(table, guild_id)] += 1
+
+    def cached(self, *tables: str):
+        """Cache a read helper that reads from `tables` and takes a guild id as its first argument."""
+        def decorator(func):
+            helper = func.__qualname__
+            @functools.wraps(func)
+            async def wrapper(guild_id, *args, **kwargs):
+                key = (helper, guild_id, args, tuple(sorted(kwargs.items())))
+                versions = tuple(self._versions[(table, guild_id)] for table in tables)
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] == versions and entry[2] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    QUERY_CACHE_LOOKUPS.inc(helper=helper, result="hit")
+                    return entry[0]
+
+                QUERY_CACHE_LOOKUPS.inc(helper=helper, result="miss")
+                result = await func(guild_id, *args, **kwargs)
+                self._entries[key] = (result, versions, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                return result
+            return wrapper
+        return decorator
+
+query_cache = QueryCache(ttl=QUERY_CACHE_TTL, max_size=QUERY_CACHE_SIZE)
+
+
+# MySQL errors for schema changes that have already been made by hand:
+# 1050 table exists, 1060 duplicate column, 1061 duplicate index
+IGNORABLE_MIGRATION_ERRORS = {1050, 1060, 1061}
+
+def _split_sql(script: str) -> List[str]:
+    lines = [line for line in script.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+def apply_migrations(directory: str = MIGRATIONS_DIR) -> List[str]:
+    """
+    Apply every migration in `directory` that has not been applied yet.
+
+    Migrations are `.sql` files named `<version>_<description>.sql` and are applied in version
+    order. Each backend has its own directory of migrations, with matching version numbers.
+    Applied versions are recorded in the `schema_migrations` table.
+
+    Args:
+        directory (str): The directory holding the migration files.
+
+    Returns:
+        List[str]: The file names of the migrations that were applied.
+    """
+    applied_now = []
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at DATETIME NOT NULL
+                )
+            """)
+            connection.commit()
+
+            cursor.execute("SELECT version FROM schema_migrations")
+            applied = {row[0] for row in cursor.fetchall()}
+
+            for file_name in sorted(os.listdir(directory)):
+                if not file_name.endswith(".sql"):
+                    continue
+                version = int(file_name.split("_", 1)[0])
+                if version in applied:
+                    continue
+
+                with open(os.path.join(directory, file_name)) as migration:
+                    statements = _split_sql(migration.read())
+                for statement in statements:
+                    try:
+                        cursor.execute(statement)
+                    except Error as e:
+                        if getattr(e, "errno", None) not in IGNORABLE_MIGRATION_ERRORS:
+                            raise
+                        log_info("Skipping already applied statement in {}: {}".format(file_name, e))
+
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                    (version, file_name, datetime.now())
+                )
+                connection.commit()
+                applied_now.append(file_name)
+                log_info("Applied migration {}".format(file_name))
+        finally:
+            cursor.close()
+    return applied_now
+
+
+@db_helper
 async def approve_event(event: Event):
     try:
         log_info("in approve event")
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
-
-        cursor = connection.cursor()
 
         # Prepare the SQL query
         update_query = """
@@ -170,170 +1391,2019 @@ async def approve_event(event: Event):
         """
 
         # Execute the query to update the status
-        cursor.execute(update_query, (
-            str(STATUS.APPROVED), str(event.event_id), str(event.event_forum_url), str(event.event_forum_id),
+        await db_execute(update_query, (
+            STATUS.APPROVED.value, str(event.event_id), str(event.event_forum_url), str(event.event_forum_id),
             str(event.uuid)
         ))
 
-
-        connection.commit()
         log_info("Event approved {}".format(event.name))
+        return True
+
+    except Error as e:
+        print(e)
+        log_error(f"Error: {e}")
+        return False
+
+
+@db_helper
+async def use_hypeman(id: str):
+    try:
+        # Prepare the SQL query
+        update_query = """
+            UPDATE events
+            SET hypeman_used = %s
+            WHERE event_forum_id = %s
+        """
+
+        # Execute the query to update the status
+        await db_execute(update_query, (
+            True,
+            str(id)
+        ))
+
+        log_info("Hypeman used {}".format(id))
+        return True
+
+    except Error as e:
+        log_error(f"Error: {e}")
+        return False
+
+@db_helper
+async def update_event_status(id: str, status: STATUS):
+    try:
+        # Prepare the SQL query
+        update_query = """
+            UPDATE events
+            SET status = %s
+            WHERE uuid = %s
+        """
+
+        # Execute the query to update the status
+        await db_execute(update_query, (
+            status.value,
+            id
+        ))
+
+        log_info("Event updated successfully! {} to {}".format(id, status))
+        return True
+
+    except Error as e:
+        log_error(f"Error: {e}")
+        return False
+
+EVENT_INSERT_QUERY = """
+    INSERT INTO events (uuid, name, description, start_time, end_time, location, op_id, op_name, original_channel_id, event_id, event_forum_url, event_forum_id, status, hypeman_used, guild_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def event_insert_row(event: Event) -> tuple:
+    return (
+        str(event.uuid), event.name, event.description, event.start_time,
+        event.end_time, event.location, event.op_id, event.op_name,
+        event.original_channel_id, event.event_id or None, event.event_forum_url,
+        event.event_forum_id or None, STATUS.PENDING.value, False, event.guild_id
+    )
+
+@db_helper
+async def save_event(event: Event):
+    try:
+        # Execute the query with the event data
+        await db_execute(EVENT_INSERT_QUERY, event_insert_row(event))
+
+        log_info("Event saved successfully! {}".format(event.name))
+        return True
+
+    except Error as e:
+        log_error(f"Error: {e}")
+        return False
+
+def _save_events(events: List[Event]):
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(EVENT_INSERT_QUERY, [event_insert_row(event) for event in events])
+            cursor.executemany(
+                "INSERT INTO approval_posts (event_uuid, guild_id, created_at) VALUES (%s, %s, %s)",
+                [(str(event.uuid), event.guild_id, datetime.now()) for event in events]
+            )
+            connection.commit()
+        except Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+@db_helper
+async def save_events(events: List[Event]):
+    """
+    Insert several new events in one transaction, along with their approval requests in
+    approval_posts, which `approval_posts` posts. Either all of them are saved or none are.
+    """
+    try:
+        await run_in_db(_save_events, events)
+
+        log_info("Saved {} events".format(len(events)))
+        return True
+
+    except Error as e:
+        log_error(f"Error: {e}")
+        return False
+
+def event_from_row(row) -> Event:
+    """
+    Build an Event from a full `events` row, normalising the column types.
+
+    Snowflake ids are kept as strings so they can be compared with `str(discord_object.id)`,
+    missing ids become "" and `status` is turned into a STATUS member.
+    """
+    (event_uuid, name, description, start_time, end_time, location, op_id, op_name,
+     original_channel_id, event_id, event_forum_url, event_forum_id, hypeman_used, status, guild_id) = row
+    return Event(
+        str(event_uuid), name, description, start_time, end_time, location, op_id, op_name,
+        original_channel_id,
+        event_id=str(event_id or ""),
+        event_forum_url=event_forum_url or "",
+        event_forum_id=str(event_forum_id or ""),
+        hypeman_used=bool(hypeman_used),
+        status=STATUS(status),
+        guild_id=int(guild_id or 0),
+    )
+
+EVENT_COLUMNS = "uuid, name, description, start_time, end_time, location, op_id, op_name, original_channel_id, event_id, event_forum_url, event_forum_id, hypeman_used, status, guild_id"
+
+@db_helper
+async def get_all_events() -> List[Event]:
+    # Prepare the SQL query
+    select_query = f"""
+        SELECT {EVENT_COLUMNS}
+        FROM events
+    """
+
+    # Execute the query to get every event
+    rows = await db_fetch(select_query)
+
+    return [event_from_row(row) for row in rows]
+
+@db_helper
+async def get_event_by_uuid(event_uuid: str):
+    # Prepare the SQL query
+    select_query = f"""
+        SELECT {EVENT_COLUMNS}
+        FROM events
+        WHERE uuid = %s
+    """
+
+    # Execute the query to get the event by uuid
+    rows = await db_fetch(select_query, (str(event_uuid),))
+
+    return event_from_row(rows[0]) if rows else None
+
+class EventRepository:
+    """
+    An in-memory index of every event, written through to the database.
+
+    Events are loaded with a single query and indexed by uuid, scheduled event id and forum
+    thread id, so lookups are dictionary hits. Writes go to the database first and only update
+    the index once they have succeeded. The whole index is reloaded on the next access once it
+    is older than `max_age` seconds or after `invalidate()` has been called. Writes and reloads
+    exclude each other, so a reload never replaces a write with a snapshot read before it
+    committed, while writes still run alongside one another.
+    """
+
+    def __init__(self, max_age: int = 0):
+        """
+        Args:
+            max_age (int): Seconds after which the index is considered stale. 0 means never.
+        """
+        self.max_age = max_age
+        self._by_uuid = {}
+        self._by_event_id = {}
+        self._by_forum_id = {}
+        self._loaded_at = None
+        self._lock = asyncio.Lock()
+        # Writes in progress, and whether a reload is waiting for them or running
+        self._writers = 0
+        self._loading = False
+        self._writes = asyncio.Condition()
+        # Events forgotten while a reload was running, which its snapshot may still contain
+        self._forgotten = set()
+
+    @property
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return bool(self.max_age) and time.monotonic() - self._loaded_at > self.max_age
+
+    async def load(self):
+        """Replace the index with the current contents of the events table."""
+        async with self._lock:
+            await self._load()
+
+    async def _load(self):
+        async with self._writes:
+            # New writes wait from here on, and the reload waits for the running ones to finish
+            self._loading = True
+            await self._writes.wait_for(lambda: self._writers == 0)
+        try:
+            events = await get_all_events()
+            self._by_uuid.clear()
+            self._by_event_id.clear()
+            self._by_forum_id.clear()
+            event_search.clear()
+            for event in events:
+                if str(event.uuid) not in self._forgotten:
+                    self._index(event)
+            self._loaded_at = time.monotonic()
+            log_info("Loaded {} events into the event cache".format(len(events)))
+        finally:
+            self._forgotten.clear()
+            async with self._writes:
+                self._loading = False
+                self._writes.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def _writing(self):
+        """Hold off reloads while a write is saved to the database and applied to the index."""
+        async with self._writes:
+            await self._writes.wait_for(lambda: not self._loading)
+            self._writers += 1
+        try:
+            yield
+        finally:
+            async with self._writes:
+                self._writers -= 1
+                self._writes.notify_all()
+
+    def invalidate(self):
+        """Force the index to be reloaded from the database on its next access."""
+        self._loaded_at = None
+
+    async def refresh(self, event_uuid: str):
+        """Reload a single event from the database."""
+        async with self._writing():
+            event = await get_event_by_uuid(event_uuid)
+            self._unindex(str(event_uuid))
+            if event is not None:
+                self._index(event)
+            return event
+
+    async def get(self, event_uuid: str):
+        await self._ensure_fresh()
+        return self._by_uuid.get(str(event_uuid))
+
+    def peek(self, event_uuid: str):
+        """Return a cached event without checking whether the cache is stale, so never touching the database."""
+        return self._by_uuid.get(str(event_uuid))
+
+    async def get_by_event_id(self, event_id):
+        await self._ensure_fresh()
+        return self._by_event_id.get(str(event_id))
+
+    async def get_by_forum_id(self, forum_id):
+        await self._ensure_fresh()
+        return self._by_forum_id.get(str(forum_id))
+
+    async def get_by_status(self, status: STATUS, guild_id: int = None) -> List[Event]:
+        await self._ensure_fresh()
+        return [
+            event for event in self._by_uuid.values()
+            if event.status == status and (guild_id is None or event.guild_id == guild_id)
+        ]
+
+    async def add(self, event: Event) -> bool:
+        async with self._writing():
+            if not await save_event(event):
+                return False
+            event.status = STATUS.PENDING
+            self._index(event)
+            return True
+
+    async def add_many(self, events: List[Event]) -> bool:
+        async with self._writing():
+            if not await save_events(events):
+                return False
+            for event in events:
+                event.status = STATUS.PENDING
+                self._index(event)
+            return True
+
+    async def approve(self, event: Event) -> bool:
+        async with self._writing():
+            if not await approve_event(event):
+                return False
+            event.status = STATUS.APPROVED
+            event.event_id = str(event.event_id)
+            event.event_forum_id = str(event.event_forum_id)
+            self._unindex(str(event.uuid))
+            self._index(event)
+            return True
+
+    async def set_status(self, event_uuid: str, status: STATUS) -> bool:
+        async with self._writing():
+            if not await update_event_status(str(event_uuid), status):
+                return False
+            event = self._by_uuid.get(str(event_uuid))
+            if event is not None:
+                event.status = status
+            return True
+
+    async def use_hypeman(self, forum_id) -> bool:
+        async with self._writing():
+            if not await use_hypeman(forum_id):
+                return False
+            event = self._by_forum_id.get(str(forum_id))
+            if event is not None:
+                event.hypeman_used = True
+            return True
+
+    async def _ensure_fresh(self):
+        if not self.is_stale:
+            return
+        async with self._lock:
+            if self.is_stale:
+                await self._load()
+
+    def _index(self, event: Event):
+        self._by_uuid[str(event.uuid)] = event
+        if event.event_id:
+            self._by_event_id[str(event.event_id)] = event
+        if event.event_forum_id:
+            self._by_forum_id[str(event.event_forum_id)] = event
+        event_search.add(event)
+
+    def forget(self, event_uuids: List[str]):
+        """Drop events that have been removed from the events table."""
+        for event_uuid in event_uuids:
+            if self._loading:
+                self._forgotten.add(str(event_uuid))
+            self._unindex(str(event_uuid))
+
+    def _unindex(self, event_uuid: str):
+        event = self._by_uuid.pop(event_uuid, None)
+        if event is None:
+            return
+        event_search.remove(event)
+        for index, key in ((self._by_event_id, event.event_id), (self._by_forum_id, event.event_forum_id)):
+            if key and index.get(str(key)) is event:
+                del index[str(key)]
+
+event_repository = EventRepository(max_age=EVENT_CACHE_MAX_AGE)
+
+# Only events members can see are returned by searches
+SEARCHABLE_STATUSES = (STATUS.APPROVED, STATUS.FINISHED)
+
+def search_tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", (text or "").casefold())
+
+class GuildSearchIndex:
+    def __init__(self):
+        # token -> {event uuid: weight}
+        self.postings = {}
+        # Every token in sorted order, for prefix lookups
+        self.tokens = []
+        # event uuid -> start time as a timestamp, for ranking
+        self.starts = {}
+
+    def tokens_with_prefix(self, prefix: str):
+        start = bisect.bisect_left(self.tokens, prefix)
+        for token in itertools.islice(self.tokens, start, None):
+            if not token.startswith(prefix):
+                return
+            yield token
+
+class EventSearchIndex:
+    """
+    A per-guild inverted index over event names, locations and descriptions.
+
+    Every query term is matched as a prefix of the indexed words, using a sorted word list, so
+    partially typed words match. An event must match every term. Results are ranked by where the
+    terms matched (name before location before description), then by how close the event is.
+    Only event uuids are indexed; they are resolved through the event cache, so a search never
+    touches the database. The index is maintained by EventRepository as events are cached.
+    """
+
+    WEIGHTS = (("name", 4), ("location", 2), ("description", 1))
+
+    def __init__(self):
+        self._guilds = {}
+
+    def clear(self):
+        self._guilds.clear()
+
+    def _weights(self, event: Event) -> dict:
+        weights = {}
+        for field, weight in self.WEIGHTS:
+            for token in search_tokens(getattr(event, field)):
+                weights[token] = max(weights.get(token, 0), weight)
+        return weights
+
+    def add(self, event: Event):
+        guild = self._guilds.setdefault(event.guild_id, GuildSearchIndex())
+        event_uuid = str(event.uuid)
+        guild.starts[event_uuid] = _naive_local(event.start_time).timestamp()
+        for token, weight in self._weights(event).items():
+            posting = guild.postings.get(token)
+            if posting is None:
+                posting = guild.postings[token] = {}
+                bisect.insort(guild.tokens, token)
+            posting[event_uuid] = weight
+
+    def remove(self, event: Event):
+        guild = self._guilds.get(event.guild_id)
+        if guild is None:
+            return
+        event_uuid = str(event.uuid)
+        guild.starts.pop(event_uuid, None)
+        for token in self._weights(event):
+            posting = guild.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(event_uuid, None)
+            if not posting:
+                del guild.postings[token]
+                del guild.tokens[bisect.bisect_left(guild.tokens, token)]
+
+    def search(self, guild_id: int, query: str, limit: int = 25) -> List[Event]:
+        guild = self._guilds.get(guild_id)
+        terms = search_tokens(query)
+        if guild is None or not terms:
+            return []
+
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token in guild.tokens_with_prefix(term):
+                for event_uuid, weight in guild.postings[token].items():
+                    if weight > term_scores.get(event_uuid, 0):
+                        term_scores[event_uuid] = weight
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {event_uuid: score + term_scores[event_uuid] for event_uuid, score in scores.items() if event_uuid in term_scores}
+            if not scores:
+                return []
+
+        now = time.time()
+        results = []
+        for event_uuid, score in scores.items():
+            event = event_repository.peek(event_uuid)
+            if event is None or event.status not in SEARCHABLE_STATUSES:
+                continue
+            # Upcoming events first, then the most recent past ones
+            seconds_away = guild.starts[event_uuid] - now
+            results.append(((-score, seconds_away < 0, abs(seconds_away)), event))
+        return [event for _, event in heapq.nsmallest(limit, results, key=lambda result: result[0])]
+
+event_search = EventSearchIndex()
+
+@db_helper
+async def get_state(name: str):
+    rows = await db_fetch("SELECT value FROM bot_state WHERE name = %s", (name,))
+    return rows[0][0] if rows else None
+
+@db_helper
+async def set_state(name: str, value: str):
+    await db_execute("REPLACE INTO bot_state (name, value) VALUES (%s, %s)", (name, value))
+
+@dataclasses.dataclass
+class GuildConfig:
+    guild_id: int
+    forum_channel_id: int = None
+    admin_channel_id: int = None
+    bot_channel_id: int = None
+    quote_channel_id: int = None
+    mod_channel_id: int = None
+
+GUILD_CONFIG_COLUMNS = "guild_id, forum_channel_id, admin_channel_id, bot_channel_id, quote_channel_id, mod_channel_id"
+
+class GuildConfigCache:
+    """
+    The channel configuration of every guild, loaded from the guild_config table at startup.
+
+    Lookups are dictionary hits, so handlers can call `get` on every message or reaction.
+    `save` writes through to the database before updating the cache.
+    """
+
+    def __init__(self):
+        self._configs = {}
+
+    @db_helper
+    async def load(self):
+        rows = await db_fetch(f"SELECT {GUILD_CONFIG_COLUMNS} FROM guild_config")
+        self._configs = {int(row[0]): GuildConfig(*row) for row in rows}
+        log_info("Loaded the configuration of {} guilds".format(len(self._configs)))
+
+    def get(self, guild_id: int):
+        """Return the guild's configuration, or None if it has not been set up."""
+        return self._configs.get(guild_id)
+
+    def __iter__(self):
+        return iter(list(self._configs.values()))
+
+    @db_helper
+    async def save(self, config: GuildConfig):
+        await db_execute(
+            f"REPLACE INTO guild_config ({GUILD_CONFIG_COLUMNS}, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            dataclasses.astuple(config) + (datetime.now(),)
+        )
+        self._configs[config.guild_id] = config
+
+guild_configs = GuildConfigCache()
+
+def _adopt_legacy_rows(guild_id: int):
+    """Assign rows written before multi-guild support, which have guild 0, to `guild_id`."""
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            for table in ("events", "quotes", "reports", "rsvps"):
+                cursor.execute(f"UPDATE {table} SET guild_id = %s WHERE guild_id = 0", (guild_id,))
+            cursor.execute(
+                "UPDATE bot_state SET name = %s WHERE name = %s",
+                (QuoteIndex.backfill_state(guild_id), QuoteIndex.BACKFILL_STATE)
+            )
+            connection.commit()
+        finally:
+            cursor.close()
+
+async def adopt_home_guild():
+    """Create the home guild's configuration from the environment and give it the legacy rows."""
+    if GUILD_ID is None:
+        return
+    await run_in_db(_adopt_legacy_rows, GUILD_ID, timeout=None)
+    if guild_configs.get(GUILD_ID) is None:
+        await guild_configs.save(GuildConfig(
+            GUILD_ID, FORUM_CHANNEL_ID, ADMIN_CHANNEL_ID, BOT_CHANNEL_ID, QUOTE_CHANNEL_ID, MOD_CHANNEL_ID
+        ))
+
+async def warm_caches():
+    await guild_configs.load()
+    await adopt_home_guild()
+    await event_repository.load()
+    await quote_index.load()
+    await report_ledger.load()
+    await quote_scores.load()
+    await calendar_feed.load()
+
+# Quotes are posted as "<content> - <@author_id>"
+QUOTE_PATTERN = re.compile(r"^(?P<content>.*) - <@!?(?P<author_id>\d+)>$", re.DOTALL)
+
+def quote_hash(content: str) -> str:
+    """
+    Hash a quote after normalising it, so that case and whitespace differences still count as duplicates.
+
+    Args:
+        content (str): The text of the quoted message.
+
+    Returns:
+        str: The hex SHA-256 of the normalised text.
+    """
+    normalized = " ".join(content.casefold().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class QuoteIndex:
+    """
+    The set of every quote ever posted, keyed by guild id, content hash and author id.
+
+    The set is warmed from the quotes table at startup so duplicate checks are a single
+    in-memory lookup, however large the quote channel gets. `claim` inserts into the table
+    so concurrent requests for the same quote cannot both succeed.
+
+    The backfill of a guild's quote channel also seeds the quotes' scores, so the history is
+    read only once.
+    """
+
+    BACKFILL_STATE = "quotes_backfilled"
+
+    def __init__(self):
+        self._keys = set()
+        self._backfills_started = set()
+
+    @staticmethod
+    def backfill_state(guild_id: int) -> str:
+        return "{}:{}".format(QuoteIndex.BACKFILL_STATE, guild_id)
+
+    @db_helper
+    async def load(self):
+        rows = await db_fetch("SELECT guild_id, content_hash, author_id FROM quotes")
+        self._keys = {(int(guild_id), content_hash, int(author_id)) for guild_id, content_hash, author_id in rows}
+        log_info("Loaded {} quotes into the quote index".format(len(self._keys)))
+
+    def contains(self, guild_id: int, content: str, author_id: int) -> bool:
+        return (guild_id, quote_hash(content), int(author_id)) in self._keys
+
+    @db_helper
+    async def claim(self, guild_id: int, content: str, author_id: int) -> bool:
+        """
+        Record a new quote before it is posted.
+
+        Returns:
+            bool: False if the quote already exists in the guild.
+        """
+        key = (guild_id, quote_hash(content), int(author_id))
+        if key in self._keys:
+            return False
+        inserted = await db_execute(
+            "INSERT IGNORE INTO quotes (guild_id, content_hash, author_id, content, created_at) VALUES (%s, %s, %s, %s, %s)",
+            key + (content, datetime.now())
+        )
+        query_cache.invalidate("quotes", guild_id)
+        self._keys.add(key)
+        return inserted == 1
+
+    @db_helper
+    async def release(self, guild_id: int, content: str, author_id: int):
+        """Forget a claimed quote that could not be posted."""
+        key = (guild_id, quote_hash(content), int(author_id))
+        await db_execute("DELETE FROM quotes WHERE guild_id = %s AND content_hash = %s AND author_id = %s", key)
+        query_cache.invalidate("quotes", guild_id)
+        self._keys.discard(key)
+
+    @db_helper
+    async def set_message_id(self, guild_id: int, content: str, author_id: int, message_id: int):
+        await db_execute(
+            "UPDATE quotes SET message_id = %s WHERE guild_id = %s AND content_hash = %s AND author_id = %s",
+            (message_id, guild_id, quote_hash(content), int(author_id))
+        )
+        query_cache.invalidate("quotes", guild_id)
+
+    async def backfill(self, guild_id: int, channel: discord.TextChannel):
+        """
+        Index every quote already in a guild's quote channel and seed its score from the thumbs up
+        on its message. This only ever runs once per guild.
+
+        The channel history is streamed oldest first and inserted in batches of
+        QUOTE_BACKFILL_BATCH_SIZE rows.
+        """
+        state = self.backfill_state(guild_id)
+        scores_state = QuoteScores.backfill_state(guild_id)
+        if guild_id in self._backfills_started:
+            return
+        self._backfills_started.add(guild_id)
+        # Guilds indexed before scores were counted are read again once, to seed their scores
+        if await get_state(state) and await get_state(scores_state):
+            return
+
+        insert_query = """
+            INSERT IGNORE INTO quotes (guild_id, content_hash, author_id, message_id, content, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        batch = []
+        counts = {}
+        total = 0
+        async for message in channel.history(limit=None, oldest_first=True):
+            match = QUOTE_PATTERN.match(message.content)
+            if match is None:
+                continue
+            content, author_id = match.group("content"), int(match.group("author_id"))
+            batch.append((guild_id, quote_hash(content), author_id, message.id, content, message.created_at.replace(tzinfo=None)))
+            counts[message.id] = thumbs_up_count(message)
+            if len(batch) >= QUOTE_BACKFILL_BATCH_SIZE:
+                total += await self._insert_batch(insert_query, batch, counts)
+                batch = []
+                counts = {}
+        if batch:
+            total += await self._insert_batch(insert_query, batch, counts)
+        await quote_scores.flush()
+
+        await set_state(state, datetime.now().isoformat())
+        await set_state(scores_state, datetime.now().isoformat())
+        log_info("Backfilled {} quotes from the quote channel of guild {}".format(total, guild_id))
+
+    @db_helper
+    async def _insert_batch(self, insert_query: str, batch: List[tuple], counts: dict) -> int:
+        await db_execute_many(insert_query, batch)
+        for guild_id in {row[0] for row in batch}:
+            query_cache.invalidate("quotes", guild_id)
+        self._keys.update((guild_id, content_hash, author_id) for guild_id, content_hash, author_id, *_ in batch)
+        for guild_id, _, _, message_id, *_ in batch:
+            quote_scores.track(guild_id, message_id)
+            quote_scores.seed(message_id, counts[message_id])
+        return len(batch)
+
+quote_index = QuoteIndex()
+
+class QuoteScore:
+    __slots__ = ("guild_id", "score", "celebrated")
+
+    def __init__(self, guild_id: int, score: int = 0, celebrated: bool = False):
+        self.guild_id = guild_id
+        self.score = score
+        self.celebrated = celebrated
+
+class QuoteScores:
+    """
+    The thumbs up count of every posted quote, keyed by the id of the quote's message.
+
+    Reactions update the counts in memory and mark them dirty; `flush` writes every dirty count in
+    one batch. Celebrations are decided from these counts, so they work for quotes of any age and
+    happen only once per quote. Each guild's quotes with a score are also kept in a list sorted by
+    score, so the leaderboard is a slice of it.
+    """
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self._scores = {}
+        self._dirty = set()
+        # guild id -> sorted [(-score, message id)] of the quotes scoring above 0
+        self._ranked = {}
+
+    @db_helper
+    async def load(self):
+        rows = await db_fetch("SELECT message_id, guild_id, score, celebrated FROM quotes WHERE message_id IS NOT NULL")
+        self._scores = {int(message_id): QuoteScore(int(guild_id), score, bool(celebrated)) for message_id, guild_id, score, celebrated in rows}
+        self._ranked = {}
+        for message_id, quote in self._scores.items():
+            if quote.score > 0:
+                self._ranked.setdefault(quote.guild_id, []).append((-quote.score, message_id))
+        for ranked in self._ranked.values():
+            ranked.sort()
+        log_info("Loaded the scores of {} quotes".format(len(self._scores)))
+
+    def track(self, guild_id: int, message_id: int):
+        self._scores.setdefault(message_id, QuoteScore(guild_id))
+
+    def seed(self, message_id: int, count: int):
+        """
+        Set a quote's score from the thumbs up already on its message. A quote that is already
+        past the threshold has missed its moment and is not celebrated.
+        """
+        quote = self._scores.get(message_id)
+        if quote is None or quote.score == count:
+            return
+        self._set_score(message_id, quote, count)
+        if count >= self.threshold:
+            quote.celebrated = True
+        self._dirty.add(message_id)
+
+    def top(self, guild_id: int, limit: int) -> List[tuple]:
+        """Return the message id and score of the guild's highest scoring quotes."""
+        return [(message_id, -score) for score, message_id in self._ranked.get(guild_id, [])[:limit]]
+
+    def _set_score(self, message_id: int, quote: QuoteScore, score: int):
+        ranked = self._ranked.setdefault(quote.guild_id, [])
+        if quote.score > 0:
+            del ranked[bisect.bisect_left(ranked, (-quote.score, message_id))]
+        quote.score = score
+        if score > 0:
+            bisect.insort(ranked, (-score, message_id))
+
+    @staticmethod
+    def backfill_state(guild_id: int) -> str:
+        return "quote_scores_backfilled:{}".format(guild_id)
+
+    def add(self, message_id: int, delta: int) -> bool:
+        """
+        Apply a thumbs up being added or removed.
+
+        Returns:
+            bool: True if the quote just reached the threshold for the first time.
+        """
+        quote = self._scores.get(message_id)
+        if quote is None:
+            return False
+        self._set_score(message_id, quote, max(0, quote.score + delta))
+        self._dirty.add(message_id)
+        if quote.score >= self.threshold and not quote.celebrated:
+            quote.celebrated = True
+            return True
+        return False
+
+    @db_helper
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        rows = [(self._scores[message_id].score, self._scores[message_id].celebrated, message_id) for message_id in dirty]
+        try:
+            await db_execute_many("UPDATE quotes SET score = %s, celebrated = %s WHERE message_id = %s", rows)
+        except Error:
+            self._dirty |= dirty
+            raise
+        for guild_id in {self._scores[message_id].guild_id for message_id in dirty}:
+            query_cache.invalidate("quotes", guild_id)
+
+quote_scores = QuoteScores(threshold=QUOTE_CELEBRATION_THRESHOLD)
+
+def thumbs_up_count(message: discord.Message) -> int:
+    """Count the thumbs up on a quote, leaving out the one the bot adds itself."""
+    for reaction in message.reactions:
+        if str(reaction.emoji) == "👍":
+            return reaction.count - (1 if reaction.me else 0)
+    return 0
+
+async def get_top_quotes(guild_id: int, limit: int = 10) -> List[tuple]:
+    """
+    Return the content, author id and score of the guild's highest scoring quotes.
+
+    The ranking comes from the scores in memory, which include reactions that have not been written yet.
+    """
+    top = quote_scores.top(guild_id, limit)
+    if not top:
+        return []
+    quotes = await get_quotes_by_message_id(guild_id, tuple(message_id for message_id, _ in top))
+    return [quotes[message_id] + (score,) for message_id, score in top if message_id in quotes]
+
+@query_cache.cached("quotes")
+@db_helper
+async def get_quotes_by_message_id(guild_id: int, message_ids: tuple) -> dict:
+    """Return the content and author id of the given quotes, keyed by message id."""
+    placeholders = ", ".join(["%s"] * len(message_ids))
+    rows = await db_fetch(
+        f"SELECT message_id, content, author_id FROM quotes WHERE guild_id = %s AND message_id IN ({placeholders})",
+        (guild_id, *message_ids)
+    )
+    return {int(message_id): (content, author_id) for message_id, content, author_id in rows}
+
+@tasks.loop(seconds=QUOTE_SCORE_FLUSH_INTERVAL)
+async def quote_score_flush_task():
+    try:
+        await quote_scores.flush()
+    except Exception as e:
+        log_error(f"Error saving quote scores: {e}")
+
+@dataclasses.dataclass
+class ReportEntry:
+    message_id: int
+    channel_id: int
+    author_id: int
+    content: str
+    posted_at: datetime
+    report_count: int = 1
+    mod_message_id: int = None
+    guild_id: int = 0
+    edit_task: asyncio.Task = None
+
+    @property
+    def text(self) -> str:
+        text = f"The following comment has been reported: {self.content} - <@{self.author_id}>"
+        if self.report_count > 1:
+            text += f" (reported {self.report_count} times)"
+        return text
+
+class ReportLedger:
+    """
+    Reports made in the last `window` seconds, keyed by the id of the reported message.
+
+    The first report of a message creates the moderator post; any further reports inside the
+    window only increment its counter, and the post is edited at most once every `edit_delay`
+    seconds to show the new count. Recent reports are loaded from the reports table at startup,
+    so the in-memory index is authoritative and checking a report is a single dictionary lookup.
+    """
+
+    def __init__(self, window: int, edit_delay: int):
+        self.window = window
+        self.edit_delay = edit_delay
+        self._entries = collections.OrderedDict()
+
+    @db_helper
+    async def load(self):
+        select_query = """
+            SELECT message_id, channel_id, author_id, content, posted_at, report_count, mod_message_id, guild_id
+            FROM reports
+            WHERE posted_at > %s
+            ORDER BY posted_at
+        """
+        rows = await db_fetch(select_query, (datetime.now() - timedelta(seconds=self.window),))
+        self._entries.clear()
+        for row in rows:
+            entry = ReportEntry(*row)
+            self._entries[entry.message_id] = entry
+
+    def record(self, guild_id: int, message: discord.Message):
+        """
+        Record a report of `message`, posted in guild `guild_id`.
+
+        Returns:
+            tuple[ReportEntry, bool]: The report entry, and whether this is the first report in the window.
+        """
+        self._expire()
+        entry = self._entries.get(message.id)
+        if entry is not None:
+            entry.report_count += 1
+            return entry, False
+        entry = ReportEntry(message.id, message.channel.id, message.author.id, message.content, datetime.now(), guild_id=guild_id)
+        self._entries[message.id] = entry
+        return entry, True
+
+    def forget(self, entry: ReportEntry):
+        """Drop a report whose moderator post could not be created."""
+        self._entries.pop(entry.message_id, None)
+
+    @db_helper
+    async def save(self, entry: ReportEntry):
+        insert_query = """
+            REPLACE INTO reports (message_id, channel_id, author_id, content, mod_message_id, report_count, posted_at, guild_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        await db_execute(insert_query, (
+            entry.message_id, entry.channel_id, entry.author_id, entry.content,
+            entry.mod_message_id, entry.report_count, entry.posted_at, entry.guild_id
+        ))
+
+    @db_helper
+    async def increment(self, entry: ReportEntry):
+        await db_execute("UPDATE reports SET report_count = %s WHERE message_id = %s", (entry.report_count, entry.message_id))
+        self.schedule_edit(entry)
+
+    def schedule_edit(self, entry: ReportEntry):
+        """Update the moderator post with the latest count, coalescing edits made in quick succession."""
+        if entry.mod_message_id is None or (entry.edit_task is not None and not entry.edit_task.done()):
+            return
+        entry.edit_task = asyncio.create_task(self._edit_after_delay(entry))
+
+    async def _edit_after_delay(self, entry: ReportEntry):
+        await asyncio.sleep(self.edit_delay)
+        config = guild_configs.get(entry.guild_id)
+        if config is None or config.mod_channel_id is None:
+            return
+        mod_channel_id = config.mod_channel_id
+        outbound.submit(
+            channel_route(mod_channel_id),
+            lambda: bot.get_channel(mod_channel_id).get_partial_message(entry.mod_message_id).edit(content=report_prompt(entry)),
+            priority=PRIORITY.MODERATION,
+            background=True,
+            call="edit_message",
+        )
+
+    def _expire(self):
+        cutoff = datetime.now() - timedelta(seconds=self.window)
+        while self._entries:
+            message_id, entry = next(iter(self._entries.items()))
+            if entry.posted_at > cutoff:
+                return
+            del self._entries[message_id]
+
+def report_prompt(entry: ReportEntry) -> str:
+    return "{} , would you like to put the channel into slow mode?".format(entry.text)
+
+report_ledger = ReportLedger(window=REPORT_COALESCE_WINDOW, edit_delay=REPORT_EDIT_DELAY)
+
+def _naive_utc(dt):
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt is not None else None
+
+def _naive_local(dt):
+    """Events read back from the database are naive local time, new ones are aware."""
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo is not None else dt
+
+@db_helper
+async def add_rsvp(event: discord.ScheduledEvent, user_id: int):
+    insert_query = """
+        REPLACE INTO rsvps (event_id, user_id, guild_id, event_name, event_start, synced_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    await db_execute(insert_query, (event.id, user_id, event.guild_id, event.name, _naive_utc(event.start_time), datetime.now()))
+    query_cache.invalidate("rsvps", event.guild_id)
+
+@db_helper
+async def remove_rsvp(guild_id: int, event_id: int, user_id: int):
+    await db_execute("DELETE FROM rsvps WHERE event_id = %s AND user_id = %s", (event_id, user_id))
+    query_cache.invalidate("rsvps", guild_id)
+
+@query_cache.cached("rsvps")
+@db_helper
+async def get_rsvps_for_user(guild_id: int, user_id: int) -> tuple:
+    """Return the names of the guild's scheduled events a user is interested in, soonest first."""
+    select_query = """
+        SELECT event_name
+        FROM rsvps
+        WHERE guild_id = %s AND user_id = %s
+        ORDER BY event_start
+    """
+    rows = await db_fetch(select_query, (guild_id, user_id))
+    return tuple(row[0] for row in rows)
+
+def _replace_rsvps(guild_id: int, rows: List[tuple], synced_at: datetime) -> int:
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.executemany("""
+                REPLACE INTO rsvps (event_id, user_id, guild_id, event_name, event_start, synced_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, rows)
+            # Anything the sync did not see, and that was not added while it ran, is gone
+            cursor.execute("DELETE FROM rsvps WHERE guild_id = %s AND synced_at < %s", (guild_id, synced_at))
+            removed = cursor.rowcount
+            connection.commit()
+            return removed
+        finally:
+            cursor.close()
+
+@db_helper
+async def sync_rsvps(guild: discord.Guild):
+    """
+    Reconcile the rsvps table with the interested users of every scheduled event in the guild.
+
+    RSVPs added by the gateway while the sync is running are kept; everything else that Discord
+    no longer reports, including RSVPs for events that have ended or been deleted, is removed.
+    """
+    synced_at = datetime.now()
+    rows = []
+    for event in await guild.fetch_scheduled_events():
+        async for user in event.users(limit=None):
+            rows.append((event.id, user.id, guild.id, event.name, _naive_utc(event.start_time), synced_at))
+    removed = await run_in_db(_replace_rsvps, guild.id, rows, synced_at, timeout=None)
+    query_cache.invalidate("rsvps", guild.id)
+    log_info("Synced {} RSVPs in guild {}, removed {} stale RSVPs".format(len(rows), guild.id, removed))
+
+@tasks.loop(minutes=RSVP_SYNC_INTERVAL)
+async def rsvp_sync_task():
+    # Only the guilds on this process's shards
+    for guild in bot.guilds:
+        try:
+            await sync_rsvps(guild)
+        except Exception as e:
+            log_error(f"Error syncing RSVPs for guild {guild.id}: {e}")
+
+class JoinDigest:
+    """
+    Buffers "user has joined" notices per event thread and posts them as one message.
+
+    A thread's buffer is flushed `delay` seconds after its first join, or straight away once
+    it holds `max_batch` users, so a burst of joins costs one send instead of one per user.
+    """
+
+    def __init__(self, delay: float, max_batch: int):
+        self.delay = delay
+        self.max_batch = max_batch
+        self._pending = {}
+        self._timers = {}
+
+    def add(self, thread_id: int, user_id: int):
+        users = self._pending.setdefault(thread_id, [])
+        if user_id not in users:
+            users.append(user_id)
+        if len(users) >= self.max_batch:
+            asyncio.create_task(self.flush(thread_id))
+        elif thread_id not in self._timers:
+            self._timers[thread_id] = asyncio.create_task(self._flush_later(thread_id))
+
+    def discard(self, thread_id: int, user_id: int):
+        """Drop a user who left again before their join was announced."""
+        users = self._pending.get(thread_id)
+        if users and user_id in users:
+            users.remove(user_id)
+
+    async def flush(self, thread_id: int):
+        timer = self._timers.pop(thread_id, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        users = self._pending.pop(thread_id, [])
+        if users:
+            outbound.send(thread_id, join_notice(users), priority=PRIORITY.NOTICE)
+
+    async def flush_all(self):
+        await asyncio.gather(*(self.flush(thread_id) for thread_id in list(self._pending)))
+
+    async def _flush_later(self, thread_id: int):
+        await asyncio.sleep(self.delay)
+        await self.flush(thread_id)
+
+def join_notice(user_ids: List[int]) -> str:
+    mentions = [f"<@{user_id}>" for user_id in user_ids]
+    if len(mentions) == 1:
+        return f"User {mentions[0]} has joined the event."
+    return f"Users {', '.join(mentions[:-1])} and {mentions[-1]} have joined the event."
+
+join_digest = JoinDigest(delay=JOIN_DIGEST_DELAY, max_batch=JOIN_DIGEST_MAX_BATCH)
+
+class EventScheduler:
+    """
+    Posts reminders for approved events and marks them FINISHED once they have ended.
+
+    Every pending timer is kept in one min-heap ordered by due time, and a single task sleeps until
+    the earliest one. The timers are built from the event cache, so starting the scheduler needs
+    no query. Rescheduling or cancelling an event gives it a new version, and timers left over
+    from the old version are dropped when they reach the top of the heap. Only events of the
+    guilds passed to `start()` are scheduled, so each process only handles the guilds on its shards.
+    """
+
+    # A wall clock change is noticed after at most this many seconds
+    MAX_SLEEP = 60 * 60
+
+    def __init__(self, reminder_hours: List[float]):
+        self.reminder_hours = sorted(reminder_hours, reverse=True)
+        self._heap = []
+        self._versions = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._guild_ids = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def start(self, guild_ids: List[int]):
+        """
+        Schedule every approved event of `guild_ids` and start firing timers.
 
-    except Error as e:
-        print(e)
-        await log_error(f"Error: {e}")
+        Args:
+            guild_ids (List[int]): The guilds on this process's shards.
+        """
+        if self._task is not None:
+            return
+        self._guild_ids = set(guild_ids)
+        for event in await event_repository.get_by_status(STATUS.APPROVED):
+            if event.guild_id not in self._guild_ids:
+                continue
+            try:
+                self.schedule(event)
+            except (TypeError, AttributeError) as e:
+                log_error(f"Could not schedule event {event.uuid}: {e}")
+        self._task = asyncio.create_task(self._run())
+        log_info("Scheduled {} event timers".format(len(self._heap)))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def schedule(self, event: Event):
+        """Replace the timers of an approved event. Reminders that are already due are skipped."""
+        if event.guild_id not in self._guild_ids:
+            # Another process handles this guild
+            return
+        event_uuid = str(event.uuid)
+        version = next(self._counter)
+        self._versions[event_uuid] = version
+        now = datetime.now()
+        start_time = _naive_local(event.start_time)
+        for hours in self.reminder_hours:
+            due = start_time - timedelta(hours=hours)
+            if due > now:
+                self._push(due, event_uuid, version, hours)
+        # A reminder of None marks the event as finished
+        self._push(_naive_local(event.end_time or event.start_time), event_uuid, version, None)
+
+    def unschedule(self, event_uuid: str):
+        self._versions.pop(str(event_uuid), None)
+
+    def _push(self, due: datetime, event_uuid: str, version: int, hours):
+        timer = (due, next(self._counter), event_uuid, version, hours)
+        heapq.heappush(self._heap, timer)
+        if self._heap[0] is timer:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap or self._heap[0][0] > datetime.now():
+                timeout = (self._heap[0][0] - datetime.now()).total_seconds() if self._heap else self.MAX_SLEEP
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(timeout, self.MAX_SLEEP))
+                continue
+
+            _, _, event_uuid, version, hours = heapq.heappop(self._heap)
+            if self._versions.get(event_uuid) != version:
+                continue
+            try:
+                await self._fire(event_uuid, hours)
+            except Exception as e:
+                log_error(f"Error firing the timer of event {event_uuid}: {e}")
+
+    async def _fire(self, event_uuid: str, hours):
+        event = await event_repository.get(event_uuid)
+        if event is None or event.status != STATUS.APPROVED:
+            self.unschedule(event_uuid)
+            return
+        if hours is None:
+            self.unschedule(event_uuid)
+            await event_repository.set_status(event_uuid, STATUS.FINISHED)
+            log_info("Event finished {}".format(event.name))
+            return
+        if event.event_forum_id:
+            outbound.send(int(event.event_forum_id), event_reminder(event, hours), priority=PRIORITY.NOTICE)
 
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+def event_reminder(event: Event, hours: float) -> str:
+    when = "an hour" if hours == 1 else f"{hours:g} hours"
+    reminder = f"<@{event.op_id}> \"{event.name}\" starts in {when}."
+    if hours == HYPEMAN_WINDOW_HOURS and not event.hypeman_used:
+        reminder += " The hypeman is now available, use /hypeman in this thread to call it."
+    return reminder
 
+event_scheduler = EventScheduler(reminder_hours=EVENT_REMINDER_HOURS)
 
-async def use_hypeman(id: str):
-    try:
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
+@dataclasses.dataclass
+class ApprovalJob:
+    event_uuid: str
+    guild_id: int
+    approver_id: int
+    channel_id: int
+    message_id: int
+    message_edited: bool = False
+    thread_id: int = None
+    thread_url: str = None
+    scheduled_event_id: int = None
+
+APPROVAL_JOB_COLUMNS = "event_uuid, guild_id, approver_id, channel_id, message_id, message_edited, thread_id, thread_url, scheduled_event_id"
+
+class ApprovalOutbox:
+    """
+    Carries out event approvals as jobs persisted in the approval_jobs table.
+
+    Clicking Approve only inserts the job, whose primary key is the event's uuid, so a second click
+    is a no-op. A background worker then edits the approval request, creates the forum thread and
+    the scheduled event, and marks the event APPROVED. The edit runs alongside the thread and the
+    scheduled event, which links to the thread and so has to wait for it. Every step is recorded as
+    soon as it is done, and a job that fails or is cut short by a restart resumes from the first
+    step that is not recorded. Only a crash between a Discord call and its record repeats a call.
+    """
 
-        cursor = connection.cursor()
+    def __init__(self, concurrency: int, retry_delay: float, max_attempts: int):
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Event uuid -> when the job's next attempt is due, for every unfinished job
+        self._due = {}
+        self._attempts = {}
+        self._running = {}
+        self._waiters = collections.defaultdict(list)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._due)
+
+    def is_pending(self, event_uuid: str) -> bool:
+        return str(event_uuid) in self._due
+
+    @db_helper
+    async def start(self, guild_ids: List[int]):
+        """Resume the unfinished jobs of the given guilds and start draining the outbox."""
+        if self._task is not None:
+            return
+        if guild_ids:
+            placeholders = ", ".join(["%s"] * len(guild_ids))
+            rows = await db_fetch(
+                f"SELECT event_uuid, attempts, next_attempt_at FROM approval_jobs WHERE status = %s AND guild_id IN ({placeholders})",
+                ("PENDING", *guild_ids)
+            )
+            for event_uuid, attempts, next_attempt_at in rows:
+                self._due.setdefault(event_uuid, next_attempt_at)
+                self._attempts.setdefault(event_uuid, attempts)
+            log_info("Resuming {} approvals".format(len(rows)))
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        # Unfinished jobs stay in the table and are resumed on the next start
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._running.values():
+            task.cancel()
+
+    @db_helper
+    async def enqueue(self, event: Event, approver_id: int, channel_id: int, message_id: int) -> bool:
+        """
+        Queue the approval of an event.
 
-        # Prepare the SQL query
-        update_query = """
-            UPDATE events
-            SET hypeman_used = %s
-            WHERE event_forum_id = %s
+        Args:
+            event (Event): The event to approve.
+            approver_id (int): The moderator who approved it.
+            channel_id (int): The channel of the approval request message.
+            message_id (int): The approval request message, which is edited to say who approved it.
+
+        Returns:
+            bool: False if the event's approval is already queued or done. A job that was given up
+            on is queued again, keeping the steps it completed.
         """
+        now = datetime.now()
+        inserted = await db_execute("""
+            INSERT IGNORE INTO approval_jobs
+                (event_uuid, guild_id, approver_id, channel_id, message_id, next_attempt_at, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (str(event.uuid), event.guild_id, approver_id, channel_id, message_id, now, now, now))
+        if not inserted:
+            inserted = await db_execute(
+                "UPDATE approval_jobs SET status = %s, attempts = 0, next_attempt_at = %s, updated_at = %s WHERE event_uuid = %s AND status = %s",
+                ("PENDING", now, now, str(event.uuid), "FAILED")
+            )
+        if not inserted:
+            return False
+        self._due[str(event.uuid)] = now
+        self._wakeup.set()
+        return True
+
+    async def wait(self, event_uuid: str):
+        """Wait until a queued approval has finished or been given up on."""
+        if not self.is_pending(event_uuid):
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[str(event_uuid)].append(future)
+        await future
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.now()
+            next_due = None
+            for event_uuid, due in list(self._due.items()):
+                if event_uuid in self._running:
+                    continue
+                if due <= now:
+                    self._running[event_uuid] = asyncio.create_task(self._process(event_uuid))
+                elif next_due is None or due < next_due:
+                    next_due = due
+            timeout = (next_due - now).total_seconds() if next_due is not None else None
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+
+    async def _process(self, event_uuid: str):
+        try:
+            async with self._semaphore:
+                try:
+                    await self._attempt(event_uuid)
+                    self._finish(event_uuid)
+                except Exception as e:
+                    await self._retry(event_uuid, e)
+        finally:
+            self._running.pop(event_uuid, None)
+            self._wakeup.set()
+
+    @db_helper
+    async def _attempt(self, event_uuid: str):
+        rows = await db_fetch(f"SELECT {APPROVAL_JOB_COLUMNS} FROM approval_jobs WHERE event_uuid = %s", (event_uuid,))
+        if not rows:
+            return
+        job = ApprovalJob(*rows[0])
+        event = await event_repository.get(event_uuid)
+        if event is None or event.status != STATUS.PENDING:
+            # The cache may not have seen the event yet, so check the database before giving up
+            event = await event_repository.refresh(event_uuid)
+        if event is None or event.status != STATUS.PENDING:
+            # Deleted, rejected, or approved by an attempt that could not record it
+            await self._update(event_uuid, status="DONE")
+            return
 
-        # Execute the query to update the status
-        cursor.execute(update_query, (
-            str(True),
-            str(id)
-        ))
+        results = await asyncio.gather(self._edit_request(job, event), self._publish(job, event), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+        event.event_forum_id = job.thread_id
+        event.event_forum_url = job.thread_url
+        event.event_id = job.scheduled_event_id
+        if not await event_repository.approve(event):
+            raise DatabaseError(f"Could not mark event {event_uuid} approved")
+        event_scheduler.schedule(event)
+        calendar_feed.update(event)
+        await self._update(event_uuid, status="DONE")
+
+    async def _edit_request(self, job: ApprovalJob, event: Event):
+        """Edit the approval request to say who approved the event."""
+        if job.message_edited:
+            return
+        content = f"The event \"{event.name}\" was approved by <@{job.approver_id}>"
+        channel = bot.get_channel(job.channel_id)
+        try:
+            await outbound.submit(
+                channel_route(job.channel_id),
+                lambda: channel.get_partial_message(job.message_id).edit(content=content, view=None),
+                priority=PRIORITY.APPROVAL,
+                call="edit_message",
+            )
+        except discord.NotFound:
+            # The request was deleted, there is nothing to edit
+            pass
+        job.message_edited = True
+        await self._update(job.event_uuid, message_edited=True)
+
+    async def _publish(self, job: ApprovalJob, event: Event):
+        """Create the event's forum thread, then its scheduled event."""
+        if job.thread_id is None:
+            forum_channel_id = guild_configs.get(job.guild_id).forum_channel_id
+            forum: discord.ForumChannel = bot.get_channel(forum_channel_id)
+            thread, _ = await outbound.submit(
+                channel_route(forum_channel_id),
+                lambda: forum.create_thread(
+                    name=f"{event.start_time} | {event.name}",
+                    content=f"{event.description}\n <@{event.op_id}> your event post is ready",
+                ),
+                priority=PRIORITY.APPROVAL,
+                call="create_thread",
+            )
+            job.thread_id = thread.id
+            job.thread_url = thread.jump_url
+            await self._update(job.event_uuid, thread_id=job.thread_id, thread_url=job.thread_url)
+
+        if job.scheduled_event_id is None:
+            # Events read back from the database have naive local times, which discord.py rejects
+            start_time = _naive_local(event.start_time).astimezone()
+            end_time = _naive_local(event.end_time).astimezone() if event.end_time else None
+            scheduled_event = await outbound.submit(guild_route(job.guild_id), lambda: bot.get_guild(job.guild_id).create_scheduled_event(
+                name=event.name,
+                start_time=start_time,
+                location=event.location,
+                end_time=end_time,
+                description=f"{event.description} \n Checkout out the discussion thread [here]({job.thread_url})!\n Point for contact for this event is <@{event.op_id}>.",
+                entity_type=discord.EntityType.external,
+                privacy_level=discord.PrivacyLevel.guild_only
+            ), priority=PRIORITY.APPROVAL, call="create_scheduled_event")
+            job.scheduled_event_id = scheduled_event.id
+            await self._update(job.event_uuid, scheduled_event_id=job.scheduled_event_id)
+
+    async def _retry(self, event_uuid: str, error: Exception):
+        attempts = self._attempts.get(event_uuid, 0) + 1
+        self._attempts[event_uuid] = attempts
+        given_up = attempts >= self.max_attempts
+        delay = self.retry_delay * 2 ** (attempts - 1)
+        due = datetime.now() + timedelta(seconds=delay)
+        if given_up:
+            log_error(f"Gave up approving event {event_uuid} after {attempts} attempts: {error}")
+        else:
+            log_error(f"Error approving event {event_uuid}, retrying in {delay:g} seconds: {error}")
+        try:
+            await self._update(
+                event_uuid, status="FAILED" if given_up else "PENDING", attempts=attempts,
+                last_error=str(error)[:1000], next_attempt_at=due
+            )
+        except Error as e:
+            log_error(f"Could not record the approval attempt of event {event_uuid}: {e}")
+        if given_up:
+            self._finish(event_uuid)
+        else:
+            self._due[event_uuid] = due
+
+    def _finish(self, event_uuid: str):
+        self._due.pop(event_uuid, None)
+        self._attempts.pop(event_uuid, None)
+        for future in self._waiters.pop(event_uuid, []):
+            if not future.done():
+                future.set_result(None)
+
+    @staticmethod
+    async def _update(event_uuid: str, **fields):
+        fields["updated_at"] = datetime.now()
+        assignments = ", ".join(f"{column} = %s" for column in fields)
+        await db_execute(f"UPDATE approval_jobs SET {assignments} WHERE event_uuid = %s", (*fields.values(), event_uuid))
+
+approval_outbox = ApprovalOutbox(
+    concurrency=APPROVAL_CONCURRENCY, retry_delay=APPROVAL_RETRY_DELAY, max_attempts=APPROVAL_MAX_ATTEMPTS
+)
+
+def _archive_events_batch(guild_ids: List[int], cutoff: datetime, batch_size: int) -> List[tuple]:
+    """
+    Move one batch of finished and rejected events that ended before `cutoff` to events_archive.
 
+    The copy and the delete happen in one transaction, so an event is never in both tables or neither.
 
-        connection.commit()
-        log_info("Hypeman used {}".format(id))
+    Returns:
+        List[tuple]: The uuid, status and forum thread id of every archived event.
+    """
+    guild_placeholders = ", ".join(["%s"] * len(guild_ids))
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT uuid, status, event_forum_id
+                FROM events
+                WHERE status IN (%s, %s) AND end_time < %s AND guild_id IN ({guild_placeholders})
+                LIMIT %s
+            """, (STATUS.FINISHED.value, STATUS.REJECTED.value, cutoff, *guild_ids, batch_size))
+            archived = cursor.fetchall()
+            if not archived:
+                return []
+
+            uuid_placeholders = ", ".join(["%s"] * len(archived))
+            uuids = tuple(row[0] for row in archived)
+            cursor.execute(f"""
+                INSERT IGNORE INTO events_archive ({EVENT_COLUMNS}, archived_at)
+                SELECT {EVENT_COLUMNS}, %s FROM events WHERE uuid IN ({uuid_placeholders})
+            """, (datetime.now(), *uuids))
+            cursor.execute(f"DELETE FROM events WHERE uuid IN ({uuid_placeholders})", uuids)
+            cursor.execute(f"DELETE FROM approval_jobs WHERE event_uuid IN ({uuid_placeholders})", uuids)
+            connection.commit()
+            return archived
+        except Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
 
-    except Error as e:
-        await log_error(f"Error: {e}")
+@db_helper
+async def archive_events(guild_ids: List[int]) -> int:
+    """
+    Archive the guilds' finished and rejected events that ended over EVENT_ARCHIVE_AFTER_DAYS ago.
 
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    Events are moved in batches of EVENT_ARCHIVE_BATCH_SIZE, each in its own transaction. With
+    ARCHIVE_EVENT_THREADS set, the forum threads of finished events are then archived and locked.
 
-def update_event_status(id: str, status: STATUS):
+    Returns:
+        int: The number of events archived.
+    """
+    if not guild_ids:
+        return 0
+    cutoff = datetime.now() - timedelta(days=EVENT_ARCHIVE_AFTER_DAYS)
+    total = 0
+    thread_ids = []
+    while True:
+        archived = await run_in_db(_archive_events_batch, guild_ids, cutoff, EVENT_ARCHIVE_BATCH_SIZE)
+        event_repository.forget([row[0] for row in archived])
+        for event_uuid, _, _ in archived:
+            calendar_feed.remove(event_uuid)
+        total += len(archived)
+        thread_ids.extend(int(forum_id) for _, status, forum_id in archived if status == STATUS.FINISHED.value and forum_id)
+        if len(archived) < EVENT_ARCHIVE_BATCH_SIZE:
+            break
+    log_info("Archived {} events".format(total))
+
+    if ARCHIVE_EVENT_THREADS:
+        for thread_id in thread_ids:
+            await archive_thread(thread_id)
+            await asyncio.sleep(EVENT_ARCHIVE_THREAD_DELAY)
+    return total
+
+async def archive_thread(thread_id: int):
+    async def archive():
+        thread = bot.get_channel(thread_id) or await bot.fetch_channel(thread_id)
+        await thread.edit(archived=True, locked=True)
     try:
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
+        await outbound.submit(channel_route(thread_id), archive, priority=PRIORITY.MAINTENANCE, call="archive_thread")
+    except discord.NotFound:
+        pass
+    except discord.HTTPException as e:
+        log_error(f"Could not archive thread {thread_id}: {e}")
 
-        cursor = connection.cursor()
+@tasks.loop(hours=EVENT_ARCHIVE_INTERVAL)
+async def event_archive_task():
+    try:
+        # Only the guilds on this process's shards
+        await archive_events([guild.id for guild in bot.guilds])
+    except Exception as e:
+        log_error(f"Error archiving events: {e}")
 
-        # Prepare the SQL query
-        update_query = """
-            UPDATE events
-            SET status = %s
-            WHERE uuid = %s
-        """
+class MemberCache:
+    """
+    An LRU of recently seen guild members.
 
-        # Execute the query to update the status
-        cursor.execute(update_query, (
-            str(status),
-            id
-        ))
+    Without the member list a member that is not in discord.py's cache is fetched from the API.
+    The last `max_size` members seen are kept here so repeat lookups stay local.
+    """
 
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._members = collections.OrderedDict()
 
-        connection.commit()
-        log_info("Event updated successfully! {} to {}".format(id, status))
+    def __len__(self):
+        return len(self._members)
 
-    except Error as e:
-        log_error(f"Error: {e}")
+    def remember(self, member: discord.Member):
+        if self.max_size <= 0:
+            return
+        key = (member.guild.id, member.id)
+        self._members[key] = member
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+
+    async def get(self, guild: discord.Guild, user_id: int):
+        """Return the member `user_id` of `guild`, or None if they are not in the guild."""
+        key = (guild.id, user_id)
+        member = self._members.get(key)
+        if member is not None:
+            self._members.move_to_end(key)
+            MEMBER_CACHE_LOOKUPS.inc(result="hit")
+            return member
+
+        member = guild.get_member(user_id)
+        if member is None:
+            MEMBER_CACHE_LOOKUPS.inc(result="miss")
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.NotFound:
+                return None
+        else:
+            MEMBER_CACHE_LOOKUPS.inc(result="hit")
+        self.remember(member)
+        return member
+
+member_cache = MemberCache(max_size=MEMBER_CACHE_SIZE)
+
+async def author_roles(ctx) -> list:
+    """Return the roles of the command's author, fetching the member if the author came without them."""
+    author = ctx.author
+    if isinstance(author, discord.Member):
+        member_cache.remember(author)
+    elif getattr(author, "roles", None) is None:
+        author = await member_cache.get(ctx.guild, author.id)
+    return author.roles if author is not None else []
+
+async def command_guild_config(ctx):
+    """Return the configuration of the guild the command was used in, telling the user if there is none."""
+    config = guild_configs.get(ctx.guild.id) if ctx.guild is not None else None
+    if config is None:
+        await ctx.send("This server has not been set up yet. Ask an admin to run /setup.", ephemeral=True)
+    return config
+
+GATEWAY_LATENCY = Gauge(
+    "mmbot_gateway_latency_seconds", "Discord gateway heartbeat latency by shard", ["shard"],
+    function=lambda: {str(shard_id): latency for shard_id, latency in bot.latencies},
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "mmbot_db_pool_connections", "Database connections by state", ["state"],
+    function=lambda: {"idle": db_pool.idle, "checked_out": db_pool.checked_out},
+)
+DB_POOL_CHECKOUTS = Counter("mmbot_db_pool_checkouts_total", "Connections checked out of the pool", function=lambda: db_pool.stats.checkouts)
+DB_POOL_WAIT = Counter("mmbot_db_pool_wait_seconds_total", "Time spent waiting for a pooled connection", function=lambda: db_pool.stats.wait_time)
+DB_POOL_CREATED = Counter("mmbot_db_pool_connections_created_total", "Database connections opened", function=lambda: db_pool.stats.connections_created)
+OUTBOUND_DEPTH = Gauge("mmbot_outbound_queue_depth", "Discord calls waiting to be sent", function=lambda: outbound.depth)
+OUTBOUND_IN_FLIGHT = Gauge("mmbot_outbound_in_flight", "Discord calls currently being made", function=lambda: outbound.in_flight)
+MEMBER_CACHE_MEMBERS = Gauge("mmbot_member_cache_members", "Members held in the member LRU", function=lambda: len(member_cache))
+EVENT_TIMERS = Gauge("mmbot_event_timers", "Event reminder and finish timers waiting in the scheduler", function=lambda: len(event_scheduler))
+COMMANDS_IN_FLIGHT = Gauge("mmbot_commands_in_flight", "App commands currently running", function=lambda: command_limiter.in_flight)
+QUERY_CACHE_ENTRIES = Gauge("mmbot_query_cache_entries", "Read helper results held in the query cache", function=lambda: len(query_cache))
+APPROVAL_JOBS = Gauge("mmbot_approval_jobs", "Event approvals queued or being retried", function=lambda: len(approval_outbox))
+MEMBER_CACHE_LOOKUPS = Counter("mmbot_member_cache_lookups_total", "Member lookups by whether the member was cached", ["result"])
+
+async def measure_event_loop_lag(interval: float = 1.0):
+    """Sleep for `interval` seconds at a time and record how much later than that the loop woke us."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - start - interval))
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(body=render_metrics().encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+class CalendarFeed:
+    """
+    An iCalendar feed of each guild's approved and finished events, served from memory.
 
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-            
-def get_events_by_status(status: STATUS) -> List[Event]:
-    try:
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
+    Each event is rendered once, when it is approved or changed. A guild's calendar is only
+    reassembled from those pieces on the first request after one of its events has changed, and
+    every version carries an ETag and Last-Modified time so polling clients get a 304 until then.
+    """
+
+    def __init__(self):
+        self._components = {}
+        self._guild_of = {}
+        self._calendars = {}
+        self._last_modified = {}
+
+    async def load(self):
+        """Render every approved and finished event in the event cache."""
+        self._components.clear()
+        self._guild_of.clear()
+        self._calendars.clear()
+        for status in (STATUS.APPROVED, STATUS.FINISHED):
+            for event in await event_repository.get_by_status(status):
+                self.update(event)
+
+    def update(self, event: Event):
+        """Add or re-render an event."""
+        event_uuid = str(event.uuid)
+        self._components.setdefault(event.guild_id, {})[event_uuid] = ics_event(
+            event_uuid, event.name, event.description, event.start_time, event.end_time, event.location, event.event_forum_url
         )
+        self._guild_of[event_uuid] = event.guild_id
+        self._calendars.pop(event.guild_id, None)
 
-        cursor = connection.cursor()
+    def remove(self, event_uuid: str):
+        guild_id = self._guild_of.pop(str(event_uuid), None)
+        if guild_id is not None:
+            del self._components[guild_id][str(event_uuid)]
+            self._calendars.pop(guild_id, None)
 
-        # Prepare the SQL query
-        select_query = """
-            SELECT uuid, name, description, start_time, end_time, location, op_id, op_name, original_channel_id, event_id, event_forum_url, event_forum_id
-            FROM events
-            WHERE status = %s
+    def calendar(self, guild_id: int) -> tuple:
         """
+        Returns:
+            tuple[bytes, str, datetime]: The guild's calendar, its ETag and when it last changed.
+        """
+        calendar = self._calendars.get(guild_id)
+        if calendar is None:
+            body = (ICS_HEADER + "".join(self._components.get(guild_id, {}).values()) + ICS_FOOTER).encode("utf-8")
+            etag = '"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+            # Last-Modified has one second resolution, so make sure each version gets a later one
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            previous = self._last_modified.get(guild_id)
+            if previous is not None and last_modified <= previous:
+                last_modified = previous + timedelta(seconds=1)
+            self._last_modified[guild_id] = last_modified
+            calendar = self._calendars[guild_id] = (body, etag, last_modified)
+        return calendar
+
+calendar_feed = CalendarFeed()
+
+def calendar_token(guild_id: int) -> str:
+    return hmac.new(CALENDAR_FEED_SECRET.encode("utf-8"), str(guild_id).encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+def calendar_url(guild_id: int) -> str:
+    url = f"{CALENDAR_BASE_URL}/calendar/{guild_id}.ics"
+    return f"{url}?token={calendar_token(guild_id)}" if CALENDAR_FEED_SECRET else url
+
+CALENDAR_REQUESTS = Counter("mmbot_calendar_requests_total", "Calendar feed requests by response", ["response"])
+
+async def calendar_handler(request: web.Request) -> web.Response:
+    guild_id = int(request.match_info["guild_id"])
+    if guild_configs.get(guild_id) is None:
+        raise web.HTTPNotFound()
+    if CALENDAR_FEED_SECRET and not hmac.compare_digest(request.query.get("token", ""), calendar_token(guild_id)):
+        raise web.HTTPNotFound()
+
+    body, etag, last_modified = calendar_feed.calendar(guild_id)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": email.utils.format_datetime(last_modified, usegmt=True),
+        "Cache-Control": f"max-age={CALENDAR_FEED_MAX_AGE}",
+    }
+    # If-None-Match takes precedence over If-Modified-Since when a client sends both
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        not_modified = if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+    else:
+        not_modified = request.if_modified_since is not None and request.if_modified_since >= last_modified
+    if not_modified:
+        CALENDAR_REQUESTS.inc(response="not_modified")
+        return web.Response(status=304, headers=headers)
+    CALENDAR_REQUESTS.inc(response="full")
+    return web.Response(body=body, headers={**headers, "Content-Type": "text/calendar; charset=utf-8"})
+
+web_app = web.Application()
+web_app.router.add_get("/metrics", metrics_handler)
+web_app.router.add_get(r"/calendar/{guild_id:\d+}.ics", calendar_handler)
+
+async def start_http_server() -> web.AppRunner:
+    runner = web.AppRunner(web_app)
+    await runner.setup()
+    await web.TCPSite(runner, HTTP_HOST, HTTP_PORT).start()
+    log_info("HTTP server listening on {}:{}".format(HTTP_HOST, HTTP_PORT))
+    return runner
+
+def command_tree_fingerprint(tree: app_commands.CommandTree, guild: discord.abc.Snowflake = None) -> str:
+    """
+    Hash the payload that syncing `tree` would send to Discord.
 
-        # Execute the query to get the events with the specified status
-        cursor.execute(select_query, (str(status),))
-
-        # Fetch all the matching records
-        rows = cursor.fetchall()
-
-        # Convert rows to list of Event instances
-        events = [Event(*row) for row in rows]
+    The hash covers every command's name, description, parameters and permissions, and the scope
+    being synced to, so any change that needs a sync changes the fingerprint.
+    """
+    commands_payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda command: (command.get("type", 1), command["name"]),
+    )
+    payload = {"guild": guild.id if guild is not None else None, "commands": commands_payload}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
 
-        return events
+async def read_command_fingerprint():
+    """Return the fingerprint of the last synced command tree, or None to force a sync."""
+    try:
+        return await get_state("command_fingerprint")
+    except Error as e:
+        logger.error(f"Could not read the command fingerprint: {e}")
+        return None
 
+async def write_command_fingerprint(fingerprint: str):
+    try:
+        await set_state("command_fingerprint", fingerprint)
     except Error as e:
-        log_error(f"Error: {e}")
-        return []
+        logger.error(f"Could not save the command fingerprint: {e}")
+
+# Event import and export. CSV files use the /createevent date format and ICS files follow RFC 5545.
+EVENT_CSV_COLUMNS = ["name", "description", "start_time", "end_time", "location"]
+EVENT_EXPORT_COLUMNS = "uuid, name, description, start_time, end_time, location, status, op_id, event_forum_url"
+EVENT_EXPORT_BATCH_SIZE = 500
+CSV_DATE_FORMAT = '%d/%m/%Y %H:%M'
+
+def parse_event_csv(text: str) -> List[dict]:
+    """Read the rows of an event CSV. The header row must name at least EVENT_CSV_COLUMNS."""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in EVENT_CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError("The CSV header is missing {}".format(", ".join(missing)))
+    rows = []
+    for row in reader:
+        try:
+            rows.append({
+                "name": row["name"] or "",
+                "description": row["description"] or "",
+                "start_time": convert_string_to_dt((row["start_time"] or "").strip()),
+                "end_time": convert_string_to_dt((row["end_time"] or "").strip()),
+                "location": row["location"] or "",
+            })
+        except ValueError as e:
+            raise ValueError("line {}: {}".format(reader.line_num, e))
+    return rows
+
+def ics_escape(text: str) -> str:
+    return (text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ics_unescape(text: str) -> str:
+    return re.sub(r"\\([\\;,nN])", lambda match: "\n" if match.group(1) in "nN" else match.group(1), text)
+
+def ics_to_dt(value: str, params: List[str]) -> datetime:
+    """Convert an ICS DATE or DATE-TIME value to an aware datetime."""
+    tzid = next((param.split("=", 1)[1] for param in params if param.upper().startswith("TZID=")), None)
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    naive = datetime.strptime(value, "%Y%m%dT%H%M%S" if "T" in value else "%Y%m%d")
+    if tzid is not None:
+        return naive.replace(tzinfo=zoneinfo.ZoneInfo(tzid))
+    return naive.astimezone()
+
+def parse_event_ics(text: str) -> List[dict]:
+    """Read the VEVENTs of an ICS calendar."""
+    # Unfold continuation lines first
+    lines = []
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+
+    rows = []
+    properties = None
+    for line in lines:
+        if line == "BEGIN:VEVENT":
+            properties = {}
+        elif line == "END:VEVENT" and properties is not None:
+            if "DTSTART" not in properties:
+                raise ValueError("An event has no DTSTART")
+            start_time = ics_to_dt(*properties["DTSTART"])
+            rows.append({
+                "name": ics_unescape(properties.get("SUMMARY", ("", []))[0]),
+                "description": ics_unescape(properties.get("DESCRIPTION", ("", []))[0]),
+                "start_time": start_time,
+                "end_time": ics_to_dt(*properties["DTEND"]) if "DTEND" in properties else start_time,
+                "location": ics_unescape(properties.get("LOCATION", ("", []))[0]),
+            })
+            properties = None
+        elif properties is not None and ":" in line:
+            key, value = line.split(":", 1)
+            name, *params = key.split(";")
+            properties[name.upper()] = (value, params)
+    return rows
+
+def ics_datetime(dt: datetime) -> str:
+    """Format a time in UTC, so calendars in every time zone show it correctly."""
+    return _naive_local(dt).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def ics_fold(line: str) -> str:
+    """Fold a content line into lines of at most 75 octets, without splitting a character."""
+    parts = []
+    current = ""
+    size = 0
+    limit = 75
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append(current)
+            current = ""
+            size = 0
+            # Continuation lines start with a space
+            limit = 74
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+ICS_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//mmbot//events//EN\r\n"
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+def ics_event(event_uuid: str, name: str, description: str, start_time: datetime, end_time: datetime, location: str, url: str = "") -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{event_uuid}@mmbot",
+        "DTSTAMP:" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "DTSTART:" + ics_datetime(start_time),
+        "DTEND:" + ics_datetime(end_time or start_time),
+        "SUMMARY:" + ics_escape(name),
+        "DESCRIPTION:" + ics_escape(description),
+        "LOCATION:" + ics_escape(location),
+    ]
+    if url:
+        lines.append("URL:" + url)
+    lines.append("END:VEVENT")
+    return "\r\n".join(ics_fold(line) for line in lines) + "\r\n"
+
+def _export_events(guild_id: int, file_format: str, out) -> int:
+    """
+    Write every event of the guild, archived ones included, to the binary file `out`.
 
-    finally:
-        if connection.is_connected():
+    Rows are streamed from the database EVENT_EXPORT_BATCH_SIZE at a time.
+
+    Returns:
+        int: The number of events written.
+    """
+    with db_pool.connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT {EVENT_EXPORT_COLUMNS} FROM events WHERE guild_id = %s
+                UNION ALL
+                SELECT {EVENT_EXPORT_COLUMNS} FROM events_archive WHERE guild_id = %s
+                ORDER BY start_time
+            """, (guild_id, guild_id))
+
+            buffer = io.StringIO()
+            if file_format == "csv":
+                writer = csv.writer(buffer)
+                writer.writerow(["uuid"] + EVENT_CSV_COLUMNS + ["status", "op_id", "event_forum_url"])
+            else:
+                buffer.write(ICS_HEADER)
+
+            total = 0
+            while True:
+                rows = cursor.fetchmany(EVENT_EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                for event_uuid, name, description, start_time, end_time, location, status, op_id, url in rows:
+                    if file_format == "csv":
+                        writer.writerow([
+                            event_uuid, name, description, _naive_local(start_time).strftime(CSV_DATE_FORMAT),
+                            _naive_local(end_time or start_time).strftime(CSV_DATE_FORMAT), location, status, op_id, url or "",
+                        ])
+                    else:
+                        buffer.write(ics_event(event_uuid, name, description, start_time, end_time, location, url or ""))
+                total += len(rows)
+                out.write(buffer.getvalue().encode("utf-8"))
+                buffer.seek(0)
+                buffer.truncate()
+
+            if file_format == "ics":
+                buffer.write(ICS_FOOTER)
+            out.write(buffer.getvalue().encode("utf-8"))
+            return total
+        finally:
             cursor.close()
-            connection.close()
 
-async def save_event(event: Event):
-    try:
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
+def approval_request(event: Event) -> str:
+    return f"Event \"{event.name}\" approval request. This event was created by <@{event.op_id}>.\nStart time: {event.start_time}\nEnd time: {event.end_time}\nLocation: {event.location}.\nDescription: {event.description}.\n Please approve or reject this event."
 
-        cursor = connection.cursor()
+class ApprovalPosts:
+    """
+    Posts the approval requests of imported events, read from the approval_posts table.
 
-        # Prepare the SQL query
-        insert_query = """
-            INSERT INTO events (uuid, name, description, start_time, end_time, location, op_id, op_name, original_channel_id, event_id, event_forum_url, event_forum_id, status, hypeman_used)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
+    Each guild's requests are posted in import order, one every `delay` seconds, by a task of its
+    own. A row is deleted once its request has been sent, so requests not posted before a restart
+    are posted when the bot starts again. Only a crash between a send and its delete posts a
+    request twice.
+    """
 
-        # Execute the query with the event data
-        cursor.execute(insert_query, (
-            str(event.uuid), event.name, event.description, event.start_time,
-            event.end_time, event.location, event.op_id, event.op_name,
-            event.original_channel_id, event.event_id, event.event_forum_url,
-            event.event_forum_id, str(STATUS.PENDING), str(False)
-        ))
+    BATCH_SIZE = 100
 
-        connection.commit()
-        log_info("Event saved successfully! {}".format(event.name))
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._tasks = {}
+        # Guilds with requests queued since their task last looked at the table
+        self._woken = set()
 
-    except Error as e:
-        await log_error(f"Error: {e}")
+    @db_helper
+    async def start(self, guild_ids: List[int]):
+        """Resume posting the requests left over from before a restart."""
+        if not guild_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(guild_ids))
+        rows = await db_fetch(f"SELECT DISTINCT guild_id FROM approval_posts WHERE guild_id IN ({placeholders})", tuple(guild_ids))
+        for (guild_id,) in rows:
+            self.wake(int(guild_id))
+
+    def stop(self):
+        # Unposted requests stay in the table and are posted on the next start
+        for task in self._tasks.values():
+            task.cancel()
+
+    def wake(self, guild_id: int):
+        """Start posting a guild's queued requests, unless that is already happening."""
+        self._woken.add(guild_id)
+        if guild_id not in self._tasks:
+            self._tasks[guild_id] = asyncio.create_task(self._run(guild_id))
+
+    async def _run(self, guild_id: int):
+        try:
+            while True:
+                self._woken.discard(guild_id)
+                rows = await db_fetch(
+                    "SELECT id, event_uuid FROM approval_posts WHERE guild_id = %s ORDER BY id LIMIT %s",
+                    (guild_id, self.BATCH_SIZE)
+                )
+                if not rows:
+                    if guild_id in self._woken:
+                        # Requests were queued while the table was being read
+                        continue
+                    return
+                for post_id, event_uuid in rows:
+                    await self._post(guild_id, event_uuid)
+                    await db_execute("DELETE FROM approval_posts WHERE id = %s", (post_id,))
+                    await asyncio.sleep(self.delay)
+        except Exception as e:
+            log_error(f"Error posting the approval requests of guild {guild_id}: {e}")
+        finally:
+            del self._tasks[guild_id]
+
+    async def _post(self, guild_id: int, event_uuid: str):
+        event = await event_repository.get(event_uuid)
+        config = guild_configs.get(guild_id)
+        if event is None or event.status != STATUS.PENDING or config is None:
+            return
+        try:
+            await outbound.send(
+                config.admin_channel_id, approval_request(event), view=Event_Approval_Message(event),
+                priority=PRIORITY.APPROVAL, background=False,
+            )
+        except Exception as e:
+            # Move on to the next request rather than retrying this one forever
+            log_error(f"Could not post the approval request of event {event_uuid}: {e}")
 
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+approval_posts = ApprovalPosts(delay=EVENT_IMPORT_POST_DELAY)
 
 def convert_string_to_dt(dt_string):
     """
@@ -365,13 +3435,21 @@ class SlowMode_Approval_Message(discord.ui.View):
         self.channel_id = channel_id
 
     @discord.ui.button(label="Agree", style=discord.ButtonStyle.green)
+    @timed_button("slowmode_agree")
     async def button_callback(self, interaction: discord.Interaction, button):
         self.stop()
-        await bot.get_channel(self.channel_id).edit(slowmode_delay=30)
-        await bot.get_channel(self.channel_id).send("The channel has been put into slow mode for 30 seconds. Please be mindful of the rules and refrain for engaging in futher arguments")
+        outbound.submit(
+            channel_route(self.channel_id),
+            lambda: bot.get_channel(self.channel_id).edit(slowmode_delay=30),
+            priority=PRIORITY.MODERATION,
+            background=True,
+            call="edit_channel",
+        )
+        outbound.send(self.channel_id, "The channel has been put into slow mode for 30 seconds. Please be mindful of the rules and refrain for engaging in futher arguments", priority=PRIORITY.MODERATION)
 
 
     @discord.ui.button(label="Disagree", style=discord.ButtonStyle.red, custom_id="disagree")
+    @timed_button("slowmode_disagree")
     async def on_disagree(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
             self.stop()
@@ -387,11 +3465,12 @@ class Hypeman_Approval_Message(discord.ui.View):
         self.channel_id = channel_id
 
     @discord.ui.button(label="Agree", style=discord.ButtonStyle.green)
+    @timed_button("hypeman_agree")
     async def button_callback(self, interaction: discord.Interaction, button):
         log_info("Button clicked")
         try:
             self.stop()
-            await use_hypeman(self.channel_id)
+            await event_repository.use_hypeman(self.channel_id)
             await interaction.response.send_message("@everyone HYPE MAN IN TOWN LET'S GO!!!!", allowed_mentions=discord.AllowedMentions(everyone=True))
         except discord.HTTPException as e:
             # Handle HTTP exceptions that occur due to network problems, Discord server errors, etc.
@@ -407,6 +3486,7 @@ class Hypeman_Approval_Message(discord.ui.View):
             log_error(f"An unexpected error occurred: {e}")
     
     @discord.ui.button(label="Disagree", style=discord.ButtonStyle.red, custom_id="disagree")
+    @timed_button("hypeman_disagree")
     async def on_disagree(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
             self.stop()
@@ -431,58 +3511,40 @@ class Event_Approval_Message(discord.ui.View):
         self.timeout = ONE_DAY_IN_SECONDS
 
     @discord.ui.button(label="Approve", style=discord.ButtonStyle.green)
+    @timed_button("event_approve")
     async def button_callback(self, interaction: discord.Interaction, button):
         """
         Handle the button click to approve an event.
 
-        This method edits the interaction message, stops the view, creates a thread for the event,
-        creates a scheduled event, and updates the event status to APPROVED.
+        This method queues the approval. The approval outbox then edits the
+        interaction message, creates a thread and a scheduled event for the event, and updates
+        the event status to APPROVED.
 
         Args:
             interaction (discord.Interaction): The interaction that triggered the button click.
             button (discord.ui.Button): The button that was clicked.
         """
         try:
-            # Get the user who clicked the button
-            user = interaction.user
-
-            # Edit the interaction message to show that the event was approved
-            custom_id = f"The event \"{self.event.name}\" was approved by <@{user.id}>"
-            await interaction.message.edit(content=custom_id, view=None)
-            self.stop()
+            # The view's copy of the event is replaced when the event cache reloads
+            event = await event_repository.get(self.event.uuid) or self.event
+            if event.status != STATUS.PENDING:
+                await interaction.response.send_message("This event has already been handled.", ephemeral=True)
+                return
 
-            # Create a thread for the event
-            thread_name = f"{self.event.start_time} | {self.event.name}"
-            forum : discord.ForumChannel = bot.get_channel(FORUM_CHANNEL_ID)
-            forum_info = await forum.create_thread(name=thread_name, content=f"{self.event.description}\n <@{self.event.op_id}> your event post is ready")
-            created_thread = forum_info[0]
-
-            # Update the event with the thread info
-            self.event.event_forum_id = created_thread.id
-            self.event.event_forum_url = created_thread.jump_url
-
-            # Create a scheduled event
-            event = await bot.get_guild(GUILD_ID).create_scheduled_event(
-                name=self.event.name,
-                start_time=self.event.start_time,
-                location=self.event.location,
-                end_time=self.event.end_time,
-                description=f"{self.event.description} \n Checkout out the discussion thread [here]({created_thread.jump_url})!\n Point for contact for this event is <@{self.event.op_id}>.",
-                entity_type=discord.EntityType.external,
-                privacy_level=discord.PrivacyLevel.guild_only
-            )
-            log_info("before assign")
-            # Update the event with the scheduled event info
-            self.event.event_id = event.id
-            log_info("after assign")
-            # Update the status to APPROVED
-            await approve_event(self.event)
+            # A second click finds the job already queued. The view stays active so an approval
+            # that failed can be retried, and the outbox removes it once the event is approved.
+            queued = await approval_outbox.enqueue(event, interaction.user.id, interaction.channel_id, interaction.message.id)
+            if queued:
+                await interaction.response.defer()
+            else:
+                await interaction.response.send_message("This event is already being approved.", ephemeral=True)
         except Exception as e:
-            await log_error(f"Error in button_callback: {e}")
+            log_error(f"Error in button_callback: {e}")
 
 
 
     @discord.ui.button(label="Reject", style=discord.ButtonStyle.red, custom_id="reject")
+    @timed_button("event_reject")
     async def on_reject(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Handle the button click to reject an event.
@@ -494,24 +3556,36 @@ class Event_Approval_Message(discord.ui.View):
             button (discord.ui.Button): The button that was clicked.
         """
         try:
-            # Get the user who clicked the button
-            user = interaction.user
+            event = await event_repository.get(self.event.uuid) or self.event
+            if approval_outbox.is_pending(event.uuid) or event.status != STATUS.PENDING:
+                await interaction.response.send_message("This event has already been handled.", ephemeral=True)
+                return
 
             # Edit the interaction message to show that the event was rejected
             custom_id = f"The event \"{self.event.name}\" was rejected. If you could like to know more, please open a ticket via Community support"
-            await interaction.message.edit(content=custom_id, view=None)
+            outbound.submit(
+                channel_route(interaction.channel_id),
+                lambda: interaction.message.edit(content=custom_id, view=None),
+                priority=PRIORITY.APPROVAL,
+                background=True,
+                call="edit_message",
+            )
 
             # Stop the view
             self.stop()
             
-            await bot.get_channel(BOT_CHANNEL_ID).send(f"<@{self.event.op_id}> The event \"{self.event.name}\" was rejected.")
+            bot_channel_id = guild_configs.get(self.event.guild_id).bot_channel_id
+            outbound.send(bot_channel_id, f"<@{self.event.op_id}> The event \"{self.event.name}\" was rejected.", priority=PRIORITY.APPROVAL)
             # Update the status to REJECTED
-            update_event_status(str(self.event.uuid), STATUS.REJECTED)
+            await event_repository.set_status(self.event.uuid, STATUS.REJECTED)
+            event_scheduler.unschedule(self.event.uuid)
+            calendar_feed.remove(self.event.uuid)
         except Exception as e:
-            await log_error(f"Error in on_reject: {e}")
+            log_error(f"Error in on_reject: {e}")
 
 @bot.tree.command(name="modsay", description="Say something on behalf of the mods")
-async def modsay(ctx, channel: discord.TextChannel = None, *, message = None):
+@timed_command("modsay")
+async def modsay(ctx, channel: discord.TextChannel = None, *, message: str = None):
     """
     Send a message as the bot to a specific channel.
 
@@ -526,22 +3600,23 @@ async def modsay(ctx, channel: discord.TextChannel = None, *, message = None):
         return
 
     # Check if the user has the "Moderator" role
-    if any(role.name == "Moderator" for role in ctx.author.roles):
+    if any(role.name == "Moderator" for role in await author_roles(ctx)):
         if channel and message:
-            await bot.get_channel(channel.id).send(message)
+            outbound.send(channel.id, message, priority=PRIORITY.MODERATION)
         else:
             await ctx.send('Missing parameters. Usage: /modsay #channel "Your message here"', ephemeral=True)
     else:
         await ctx.send("You do not have permission to use this command.", ephemeral=True)
 
 @bot.tree.command(name="hypeman", description="Create some hype for an event you created")
+@timed_command("hypeman")
 async def hypeman(ctx):
     # Delete the invoking message
     await ctx.message.delete()
 
     channel_id = ctx.channel.id
 
-    event = get_event_from_channel_id(channel_id)
+    event = await event_repository.get_by_forum_id(channel_id)
     if event is None:
         await ctx.send("The hype didn't work. There was an error", ephemeral=True)
         log_error("More than one event found for channel. I've no idea how this could even happen")
@@ -550,11 +3625,11 @@ async def hypeman(ctx):
         log_info("Hypeman has already been used")
         await ctx.send("The hype didn't work. The hype man has been used and is tired", ephemeral=True)
         return
-    # Get the current time
-    now = datetime.now()
+    # Get the current time, matching the event's timezone awareness
+    now = datetime.now(event.start_time.tzinfo)
     # Calculate the time difference
     time_difference = event.start_time - now
-    if timedelta(hours=0) <= time_difference <= timedelta(hours=72):
+    if timedelta(hours=0) <= time_difference <= timedelta(hours=HYPEMAN_WINDOW_HOURS):
         if event.event_forum_id == str(channel_id):
             log_info("Hypeman called")
             await ctx.send(
@@ -563,11 +3638,12 @@ async def hypeman(ctx):
             )
             
     else:
-        log_info("It is not within 72 hours of the event.")
-        await ctx.send("It is not within 72 hours of the event.", ephemeral=True)
+        log_info(f"It is not within {HYPEMAN_WINDOW_HOURS} hours of the event.")
+        await ctx.send(f"It is not within {HYPEMAN_WINDOW_HOURS} hours of the event.", ephemeral=True)
 
 @bot.tree.command(name="createevent", description="Create an event")
-async def createevent(ctx, name=None, description=None, start_time=None, end_time=None, location=None):
+@timed_command("createevent")
+async def createevent(ctx, name: str = None, description: str = None, start_time: str = None, end_time: str = None, location: str = None):
     """
     Create a new event.
 
@@ -613,41 +3689,159 @@ async def createevent(ctx, name=None, description=None, start_time=None, end_tim
         await ctx.send(f"At least one of the date strings you gave contains an issue: {str(e)}", ephemeral=True)
         return
 
+    config = await command_guild_config(ctx)
+    if config is None:
+        return
+
     # Create a new Event object
-    event = Event(uuid.uuid4(), name, description, start_time, end_time, location, ctx.author.id, ctx.author.name, ctx.channel.id)
+    event = Event(uuid.uuid4(), name, description, start_time, end_time, location, ctx.author.id, ctx.author.name, ctx.channel.id, guild_id=config.guild_id)
 
-    await save_event(event)
+    await event_repository.add(event)
 
     # Send an approval request
-    await bot.get_channel(ADMIN_CHANNEL_ID).send(
-        f"Event \"{event.name}\" approval request. This event was created by <@{ctx.author.id}>.\nStart time: {event.start_time}\nEnd time: {event.end_time}\nLocation: {event.location}.\nDescription: {event.description}.\n Please approve or reject this event.",
+    outbound.send(
+        config.admin_channel_id,
+        approval_request(event),
         view=Event_Approval_Message(event),
+        priority=PRIORITY.APPROVAL,
     )
 
     await ctx.send("Your event has been sent to the EC's for approval. Please be patient while they find time to review", ephemeral=True)
 
+@bot.tree.command(name="importevents", description="Create events from a CSV or ICS file")
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_events=True)
+@timed_command("importevents")
+async def importevents(interaction: discord.Interaction, file: discord.Attachment):
+    """
+    Create an event for every row of a CSV file or every VEVENT of an ICS file.
+
+    CSV files need a header row with name, description, start_time, end_time and location, with
+    times in the /createevent format. All the events are saved in one transaction, or none are if
+    any row is invalid, and their approval requests are then posted one at a time.
+
+    Args:
+        interaction (discord.Interaction): The interaction that invoked the command.
+        file (discord.Attachment): The CSV or ICS file.
+    """
+    config = guild_configs.get(interaction.guild_id)
+    if config is None:
+        await interaction.response.send_message("This server has not been set up yet. Ask an admin to run /setup.", ephemeral=True)
+        return
+    if file.size > EVENT_IMPORT_MAX_BYTES:
+        await interaction.response.send_message(f"The file is too large, at most {EVENT_IMPORT_MAX_BYTES // 1024} KB can be imported at once.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+        if file.filename.lower().endswith(".ics"):
+            rows = parse_event_ics(text)
+        else:
+            rows = parse_event_csv(text)
+    except (ValueError, KeyError, UnicodeDecodeError, zoneinfo.ZoneInfoNotFoundError) as e:
+        await interaction.followup.send(f"The file could not be read: {e}", ephemeral=True)
+        return
+
+    if not rows:
+        await interaction.followup.send("The file has no events.", ephemeral=True)
+        return
+    if len(rows) > EVENT_IMPORT_MAX_ROWS:
+        await interaction.followup.send(f"The file has {len(rows)} events, at most {EVENT_IMPORT_MAX_ROWS} can be imported at once.", ephemeral=True)
+        return
+    invalid = [number for number, row in enumerate(rows, start=1) if not row["name"] or row["end_time"] < row["start_time"]]
+    if invalid:
+        await interaction.followup.send(
+            "Events {} need a name and must not end before they start.".format(", ".join(map(str, invalid[:20]))), ephemeral=True
+        )
+        return
+
+    user = interaction.user
+    # Times are stored as local wall clock time, so convert those given in another zone
+    events = [
+        Event(uuid.uuid4(), row["name"], row["description"], row["start_time"].astimezone(), row["end_time"].astimezone(), row["location"],
+              user.id, user.name, interaction.channel_id, guild_id=config.guild_id)
+        for row in rows
+    ]
+    if not await event_repository.add_many(events):
+        await interaction.followup.send("The events could not be saved. Please try again later.", ephemeral=True)
+        return
+
+    approval_posts.wake(config.guild_id)
+    await interaction.followup.send(f"Imported {len(events)} events. Their approval requests are being posted.", ephemeral=True)
+
+@bot.tree.command(name="exportevents", description="Download every event of this server")
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_events=True)
+@app_commands.rename(file_format="format")
+@timed_command("exportevents")
+async def exportevents(interaction: discord.Interaction, file_format: Literal["csv", "ics"] = "csv"):
+    """
+    Send a file with every event of the server, archived events included.
+
+    The CSV export can be imported again with /importevents.
+
+    Args:
+        interaction (discord.Interaction): The interaction that invoked the command.
+        file_format (str): csv or ics.
+    """
+    await interaction.response.defer(ephemeral=True)
+    # Small exports stay in memory, large ones spill to disk
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as out:
+        try:
+            total = await run_in_db(_export_events, interaction.guild_id, file_format, out, timeout=None)
+        except Error as e:
+            log_error(f"Error exporting events: {e}")
+            await interaction.followup.send("The events could not be exported. Please try again later.", ephemeral=True)
+            return
+        out.seek(0)
+        await interaction.followup.send(
+            f"Exported {total} events.", file=discord.File(out, filename=f"events.{file_format}"), ephemeral=True
+        )
+
 @bot.event
 async def on_scheduled_event_user_add(event, user):
     """
     Handle the addition of a user to a scheduled event.
 
-    This method checks if the user is already in the event. If not, it sends a message to the event's forum channel.
+    This method records the RSVP and queues a join notice for the event's forum thread. Notices are
+    posted in batches by `join_digest`.
+
+    Args:
+        event (discord.ScheduledEvent): The scheduled event.
+        user (discord.User | discord.Object): The user who was added to the event. Only `id` is set for uncached users.
+    """
+    try:
+        await add_rsvp(event, user.id)
+
+        _event = await event_repository.get_by_event_id(event.id)
+        # If the user is not in the event, send a message to the event's forum channel
+        if _event is not None and _event.status == STATUS.APPROVED:
+            join_digest.add(int(_event.event_forum_id), user.id)
+    except Exception as e:
+        log_error(f"Error in on_scheduled_event_user_add: {e}")
+
+@bot.event
+async def on_scheduled_event_user_remove(event, user):
+    """
+    Handle the removal of a user from a scheduled event.
 
     Args:
         event (discord.ScheduledEvent): The scheduled event.
-        user (discord.User): The user who was added to the event.
+        user (discord.User | discord.Object): The user who was removed from the event. Only `id` is set for uncached users.
     """
     try:
-        approved_events = get_events_by_status(STATUS.APPROVED)
-        for _event in approved_events:
-            # If the user is not in the event, send a message to the event's forum channel
-            if _event.event_id == str(event.id):
-                await bot.get_channel(_event.event_forum_id).send(f"User <@{user.id}> has joined the event.")
+        await remove_rsvp(event.guild_id, event.id, user.id)
+
+        _event = await event_repository.get_by_event_id(event.id)
+        if _event is not None and _event.event_forum_id:
+            join_digest.discard(int(_event.event_forum_id), user.id)
     except Exception as e:
-        await log_error(f"Error in on_scheduled_event_user_add: {e}")
+        log_error(f"Error in on_scheduled_event_user_remove: {e}")
 
 
 @bot.tree.command(name="report", description="Report something someone said")
+@timed_command("report")
 async def report(ctx):
     try:
         await ctx.message.delete()
@@ -657,30 +3851,50 @@ async def report(ctx):
         await ctx.send("The bot does not have the required permissions to delete messages or fetch message history.", ephemeral=True)
         return
 
-    report = f"The following comment has been reported: {message.content} - <@{message.author.id}>"
+    config = await command_guild_config(ctx)
+    if config is None:
+        return
 
     # Check for duplicate reports
-    report_channel = bot.get_channel(MOD_CHANNEL_ID)
-    try:
-        async for old_message in report_channel.history(limit=200):  # Adjust the limit as needed
-            if old_message.content == report:
-                await ctx.send("This has already been reported.", ephemeral=True)
-                return
-    except discord.Forbidden:
-        log_error("The bot could not find permissions to get quote channel")
-        await ctx.send("The bot does not have the required permissions to fetch message history.", ephemeral=True)
+    entry, is_first_report = report_ledger.record(config.guild_id, message)
+    if not is_first_report:
+        try:
+            await report_ledger.increment(entry)
+        except Error as e:
+            log_error(f"Error counting report: {e}")
+        await ctx.send("This has already been reported.", ephemeral=True)
         return
+
     try:
-        await bot.get_channel(MOD_CHANNEL_ID).send(
-                "{} , would you like to put the channel into slow mode?".format(report),
-                view=SlowMode_Approval_Message(ctx.channel.id)
+        mod_message = await outbound.send(
+                config.mod_channel_id,
+                report_prompt(entry),
+                view=SlowMode_Approval_Message(ctx.channel.id),
+                priority=PRIORITY.MODERATION,
+                background=False,
             )
-    except discord.Forbidden:
-        log_error("The bot could not find permissions to post report")
-        await ctx.send("The bot does not have the required permissions to send report.", ephemeral=True)
+    except Exception as e:
+        # Forget the entry, or later reports of the message would be dropped as duplicates
+        report_ledger.forget(entry)
+        if isinstance(e, discord.Forbidden):
+            log_error("The bot could not find permissions to post report")
+            await ctx.send("The bot does not have the required permissions to send report.", ephemeral=True)
+        else:
+            log_error(f"Error posting report: {e}")
+            await ctx.send("The report could not be sent. Please try again later.", ephemeral=True)
         return
-    
+
+    # Other reports may have come in while the post was being sent
+    entry.mod_message_id = mod_message.id
+    if entry.report_count > 1:
+        report_ledger.schedule_edit(entry)
+    try:
+        await report_ledger.save(entry)
+    except Error as e:
+        log_error(f"Error saving report: {e}")
+
 @bot.tree.command(name="quotethat", description="Add something to the qotd channel")
+@timed_command("quotethat")
 async def quotethat(ctx):
     """
     Quote a message in the quote channel.
@@ -703,85 +3917,257 @@ async def quotethat(ctx):
         await ctx.send("The bot does not have the required permissions to delete messages or fetch message history.", ephemeral=True)
         return
 
+    config = await command_guild_config(ctx)
+    if config is None:
+        return
+    guild_id = config.guild_id
+    quote_channel_id = config.quote_channel_id
+
     quote = f"{message.content} - <@{message.author.id}>"
 
     # Check for duplicate quotes
-    quote_channel = bot.get_channel(QUOTE_CHANNEL_ID)
     try:
-        async for old_message in quote_channel.history(limit=200):  # Adjust the limit as needed
-            if old_message.content == quote:
-                await ctx.send("This quote already exists in the quote channel.", ephemeral=True)
-                return
-    except discord.Forbidden:
-        log_error("The bot could not find permissions to get quote channel")
-        await ctx.send("The bot does not have the required permissions to fetch message history.", ephemeral=True)
+        is_new_quote = await quote_index.claim(guild_id, message.content, message.author.id)
+    except Error as e:
+        log_error(f"Error checking for duplicate quotes: {e}")
+        await ctx.send("The quote could not be saved. Please try again later.", ephemeral=True)
+        return
+    if not is_new_quote:
+        await ctx.send("This quote already exists in the quote channel.", ephemeral=True)
         return
 
     # Send the quote and add reactions
     try:
-        quote_message = await quote_channel.send(quote)
-    except discord.Forbidden:
-        log_error("The bot could not find permissions to post quote")
-        await ctx.send("The bot does not have the required permissions to send messages.", ephemeral=True)
+        quote_message = await outbound.send(quote_channel_id, quote, background=False)
+        try:
+            await quote_index.set_message_id(guild_id, message.content, message.author.id, quote_message.id)
+        except Exception:
+            # A quote that isn't linked to its message can't be scored, so take it down again
+            outbound.submit(channel_route(quote_channel_id), quote_message.delete, background=True, call="delete_message")
+            raise
+    except Exception as e:
+        # Release the claim, or the quote could never be posted again
+        try:
+            await quote_index.release(guild_id, message.content, message.author.id)
+        except Error as release_error:
+            log_error(f"Error releasing quote: {release_error}")
+        if isinstance(e, discord.Forbidden):
+            log_error("The bot could not find permissions to post quote")
+            await ctx.send("The bot does not have the required permissions to send messages.", ephemeral=True)
+        else:
+            log_error(f"Error posting quote: {e}")
+            await ctx.send("The quote could not be posted. Please try again later.", ephemeral=True)
         return
+    quote_scores.track(guild_id, quote_message.id)
 
     keklaugh_emoji = discord.utils.get(ctx.guild.emojis, name='keklaugh')
 
+    reactions = ["👍", "👎", "😄", "😢", "❤️"]
     if keklaugh_emoji is None:
         await ctx.send("Couldn't find a custom emoji with the name 'keklaugh'. Tell <@{CHEESECAKE_USER_ID}> to add it to the server or check the code.", ephemeral=True)
         log_error("The emjoi {} could not be found".format(keklaugh_emoji))
     else:
-        reactions = ["👍", "👎", "😄", "😢", "❤️", keklaugh_emoji]
+        reactions.append(keklaugh_emoji)
+
+    # Reactions are queued behind everything else and failures are reported by the queue
     for reaction in reactions:
-        try:
-            await quote_message.add_reaction(reaction)
-        except discord.Forbidden:
-            log_error("The bot does not have the required permissions to add reactions.")
-            await ctx.send("The bot does not have the required permissions to add reactions.", ephemeral=True)
-            return
+        outbound.submit(
+            channel_route(quote_channel_id),
+            functools.partial(quote_message.add_reaction, reaction),
+            priority=PRIORITY.REACTION,
+            background=True,
+            call="add_reaction",
+        )
 
 @bot.tree.command(name="mymeetups", description="List the meetups the user has joined")
+@timed_command("mymeetups")
 async def mymeetups(ctx):
     """
     List the meetups the user has joined.
 
-    This command sends a message listing the IDs of the meetups the user has joined.
+    This command sends a message listing the names of the meetups the user has joined, read from the RSVP table.
 
     Args:
         ctx (discord.ext.commands.Context): The context in which the command was called.
     """
     await ctx.message.delete()
     user_id = ctx.author.id
-    guild = ctx.guild
-
-    # Fetch all scheduled events from the guild
-    scheduled_events = await guild.fetch_scheduled_events()
-
-    # Check each event to see if the user is in the list of users
-    user_events = []
-    for event in scheduled_events:
-        async for user in event.users():  # Use async for to iterate over async generator
-            if user.id == user_id:
-                user_events.append(event)
-                break  # Exit the loop early if the user is found
 
+    try:
+        event_names = await get_rsvps_for_user(ctx.guild.id, user_id)
+    except Error as e:
+        log_error(f"Error in mymeetups: {e}")
+        await ctx.send("Your meetups could not be loaded. Please try again later.", ephemeral=True)
+        return
 
-    if not user_events:
+    if not event_names:
         await ctx.send("You have not joined any meetups.", ephemeral=True)
     else:
-        event_names = [event.name for event in user_events]
         await ctx.send(f"You have joined the following meetups: {', '.join(event_names)}", ephemeral=True)
 
+@bot.tree.command(name="topquotes", description="Show the quotes with the most thumbs up")
+@app_commands.guild_only()
+@timed_command("topquotes")
+async def topquotes(interaction: discord.Interaction):
+    """
+    List the server's ten highest scoring quotes.
+
+    Args:
+        interaction (discord.Interaction): The interaction that invoked the command.
+    """
+    try:
+        top_quotes = await get_top_quotes(interaction.guild_id)
+    except Error as e:
+        log_error(f"Error in topquotes: {e}")
+        await interaction.response.send_message("The top quotes could not be loaded. Please try again later.", ephemeral=True)
+        return
+
+    if not top_quotes:
+        await interaction.response.send_message("No quotes have any thumbs up yet.", ephemeral=True)
+        return
+    lines = [f"{rank}. {content} - <@{author_id}> ({score} 👍)" for rank, (content, author_id, score) in enumerate(top_quotes, start=1)]
+    await interaction.response.send_message("\n".join(lines)[:2000], allowed_mentions=discord.AllowedMentions.none())
+
+def event_summary(event: Event) -> str:
+    summary = f"{event.name} ({_naive_local(event.start_time).strftime(CSV_DATE_FORMAT)}, {event.location})"
+    if event.status == STATUS.FINISHED:
+        summary += " [finished]"
+    return summary
+
+async def event_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """Suggest events of the guild matching what has been typed so far. Choice values are event uuids."""
+    return [
+        app_commands.Choice(name=event_summary(event)[:100], value=str(event.uuid))
+        for event in event_search.search(interaction.guild_id, current, limit=25)
+    ]
+
+@bot.tree.command(name="findevent", description="Search the server's events by name, location or description")
+@app_commands.guild_only()
+@app_commands.autocomplete(query=event_autocomplete)
+@timed_command("findevent")
+async def findevent(interaction: discord.Interaction, query: str):
+    """
+    List the events matching a search, or show the event picked from the suggestions.
+
+    Args:
+        interaction (discord.Interaction): The interaction that invoked the command.
+        query (str): Words to search for. Partial words match too.
+    """
+    event = event_repository.peek(query)
+    if event is not None and event.guild_id == interaction.guild_id and event.status in SEARCHABLE_STATUSES:
+        events = [event]
+    else:
+        events = event_search.search(interaction.guild_id, query, limit=10)
+
+    if not events:
+        await interaction.response.send_message("No events match your search.", ephemeral=True)
+        return
+    lines = [f"{event_summary(event)} {event.event_forum_url}".rstrip() for event in events]
+    await interaction.response.send_message("\n".join(lines)[:2000], ephemeral=True)
+
+@bot.tree.command(name="calendar", description="Get a link to subscribe to this server's events in your calendar app")
+@app_commands.guild_only()
+@timed_command("calendar")
+async def calendar(interaction: discord.Interaction):
+    """
+    Reply with the URL of the server's calendar feed.
+
+    Args:
+        interaction (discord.Interaction): The interaction that invoked the command.
+    """
+    await interaction.response.send_message(
+        f"Add this URL to your calendar app to subscribe to the server's events: {calendar_url(interaction.guild_id)}", ephemeral=True
+    )
+
+@bot.tree.command(name="setup", description="Choose the channels the bot uses in this server")
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+@timed_command("setup")
+async def setup_guild(
+    interaction: discord.Interaction,
+    forum: discord.ForumChannel,
+    admin: discord.TextChannel,
+    bot_channel: discord.TextChannel,
+    quotes: discord.TextChannel,
+    moderators: discord.TextChannel,
+):
+    """
+    Create or replace the calling guild's configuration.
+
+    Args:
+        interaction (discord.Interaction): The interaction that invoked the command.
+        forum (discord.ForumChannel): Where approved events get a discussion thread.
+        admin (discord.TextChannel): Where event approval requests are posted.
+        bot_channel (discord.TextChannel): Where event organisers are told about rejections.
+        quotes (discord.TextChannel): Where /quotethat posts quotes.
+        moderators (discord.TextChannel): Where /report posts reports.
+    """
+    config = GuildConfig(interaction.guild_id, forum.id, admin.id, bot_channel.id, quotes.id, moderators.id)
+    try:
+        await guild_configs.save(config)
+    except Error as e:
+        log_error(f"Error saving the configuration of guild {interaction.guild_id}: {e}")
+        await interaction.response.send_message("The configuration could not be saved. Please try again later.", ephemeral=True)
+        return
+    await interaction.response.send_message("This server is set up.", ephemeral=True)
+    asyncio.create_task(backfill_guild_quotes(interaction.guild_id))
+
+@bot.event
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    if not is_quote_thumbs_up(payload):
+        return
+    if quote_scores.add(payload.message_id, 1):
+        outbound.send(
+            payload.channel_id,
+            f"🎉 This quote has reached {QUOTE_CELEBRATION_THRESHOLD} thumbs up! 🎉",
+            reference=discord.MessageReference(message_id=payload.message_id, channel_id=payload.channel_id, fail_if_not_exists=False),
+            priority=PRIORITY.NOTICE,
+        )
+
 @bot.event
-async def on_reaction_add(reaction, user):
-    if reaction.message.channel.id == QUOTE_CHANNEL_ID and reaction.emoji == "👍":
-        if reaction.count == 10:
-            await reaction.message.channel.send(f"🎉 This quote has reached 10 thumbs up! 🎉")
+async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
+    if is_quote_thumbs_up(payload):
+        quote_scores.add(payload.message_id, -1)
+
+def is_quote_thumbs_up(payload: discord.RawReactionActionEvent) -> bool:
+    """Whether a raw reaction event is someone other than the bot giving or taking back a thumbs up on a quote."""
+    config = guild_configs.get(payload.guild_id)
+    if config is None or payload.channel_id != config.quote_channel_id:
+        return False
+    if bot.user is not None and payload.user_id == bot.user.id:
+        return False
+    return str(payload.emoji) == "👍"
 
 @bot.event
 async def on_ready():
     print(f"Logged in as {bot.user.name} ({bot.user.id})")
     print("Ready!")
+    asyncio.create_task(backfill_quotes())
+    if not rsvp_sync_task.is_running():
+        rsvp_sync_task.start()
+    if not event_archive_task.is_running():
+        event_archive_task.start()
+    if not quote_score_flush_task.is_running():
+        quote_score_flush_task.start()
+    await event_scheduler.start([guild.id for guild in bot.guilds])
+    await approval_outbox.start([guild.id for guild in bot.guilds])
+    await approval_posts.start([guild.id for guild in bot.guilds])
+
+async def backfill_quotes():
+    # Only the guilds on this process's shards
+    for guild in bot.guilds:
+        await backfill_guild_quotes(guild.id)
+
+async def backfill_guild_quotes(guild_id: int):
+    config = guild_configs.get(guild_id)
+    if config is None or config.quote_channel_id is None:
+        return
+    try:
+        channel = bot.get_channel(config.quote_channel_id)
+        await quote_index.backfill(guild_id, channel)
+    except Exception as e:
+        log_error(f"Error backfilling quotes for guild {guild_id}: {e}")
 
-# Run the bot with your token
-bot.run(BOT_TOKEN)
\ No newline at end of file
+if __name__ == "__main__":
+    # Run the bot with your token
+    bot.run(BOT_TOKEN)
\ No newline at end of file
@@ -0,0 +1,16 @@
+-- The original events table, as created by init.sql before migrations existed.
+CREATE TABLE IF NOT EXISTS events (
+    uuid VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(500),
+    description TEXT,
+    start_time DATETIME,
+    end_time DATETIME,
+    location VARCHAR(255),
+    op_id INT,
+    op_name VARCHAR(255),
+    original_channel_id INT,
+    event_id INT,
+    event_forum_url VARCHAR(255),
+    event_forum_id INT,
+    status VARCHAR(20)
+);
@@ -0,0 +1,21 @@
+-- Discord snowflakes do not fit in a 32-bit INT, hypeman_used was never created and
+-- statuses were written as "STATUS.APPROVED" rather than "APPROVED".
+
+-- Skipped by the migration runner if the column was added by hand.
+ALTER TABLE events ADD COLUMN hypeman_used VARCHAR(5);
+
+UPDATE events SET status = SUBSTRING_INDEX(status, '.', -1) WHERE status LIKE 'STATUS.%';
+UPDATE events SET status = 'PENDING' WHERE status IS NULL OR status NOT IN ('PENDING', 'APPROVED', 'REJECTED');
+UPDATE events SET hypeman_used = CASE WHEN LOWER(hypeman_used) IN ('1', 'true') THEN '1' ELSE '0' END;
+
+ALTER TABLE events
+    MODIFY op_id BIGINT UNSIGNED,
+    MODIFY original_channel_id BIGINT UNSIGNED,
+    MODIFY event_id BIGINT UNSIGNED NULL,
+    MODIFY event_forum_id BIGINT UNSIGNED NULL,
+    MODIFY hypeman_used BOOLEAN NOT NULL DEFAULT FALSE,
+    MODIFY status ENUM('PENDING', 'APPROVED', 'REJECTED') NOT NULL DEFAULT 'PENDING';
+
+-- Pending events used to store '' for ids that did not exist yet.
+UPDATE events SET event_id = NULL WHERE event_id = 0;
+UPDATE events SET event_forum_id = NULL WHERE event_forum_id = 0;
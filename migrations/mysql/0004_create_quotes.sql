@@ -0,0 +1,17 @@
+-- Quotes posted to the quote channel, keyed by a hash of the normalised quote text and its author.
+CREATE TABLE IF NOT EXISTS quotes (
+    content_hash CHAR(64) NOT NULL,
+    author_id BIGINT UNSIGNED NOT NULL,
+    message_id BIGINT UNSIGNED NULL,
+    content TEXT,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (content_hash, author_id)
+);
+
+CREATE INDEX idx_quotes_message_id ON quotes (message_id);
+
+-- Small key/value store for one-off bookkeeping such as finished backfills.
+CREATE TABLE IF NOT EXISTS bot_state (
+    name VARCHAR(100) PRIMARY KEY,
+    value VARCHAR(255) NOT NULL
+);
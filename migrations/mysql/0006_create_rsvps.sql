@@ -0,0 +1,13 @@
+-- Local copy of who is interested in each scheduled event, kept up to date from gateway
+-- events and reconciled with Discord by a periodic sync.
+CREATE TABLE IF NOT EXISTS rsvps (
+    event_id BIGINT UNSIGNED NOT NULL,
+    user_id BIGINT UNSIGNED NOT NULL,
+    event_name VARCHAR(255) NOT NULL,
+    event_start DATETIME NULL,
+    synced_at DATETIME NOT NULL,
+    PRIMARY KEY (event_id, user_id)
+);
+
+CREATE INDEX idx_rsvps_user_id ON rsvps (user_id);
+CREATE INDEX idx_rsvps_synced_at ON rsvps (synced_at);
@@ -0,0 +1,24 @@
+-- Per-guild channel configuration, so one process can serve many guilds.
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id BIGINT UNSIGNED PRIMARY KEY,
+    forum_channel_id BIGINT UNSIGNED NULL,
+    admin_channel_id BIGINT UNSIGNED NULL,
+    bot_channel_id BIGINT UNSIGNED NULL,
+    quote_channel_id BIGINT UNSIGNED NULL,
+    mod_channel_id BIGINT UNSIGNED NULL,
+    updated_at DATETIME NOT NULL
+);
+
+-- Scope everything by guild. Existing rows get guild 0 and are adopted by GUILD_ID at startup.
+ALTER TABLE events ADD COLUMN guild_id BIGINT UNSIGNED NOT NULL DEFAULT 0;
+CREATE INDEX idx_events_guild_id ON events (guild_id);
+
+ALTER TABLE quotes
+    ADD COLUMN guild_id BIGINT UNSIGNED NOT NULL DEFAULT 0 FIRST,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (guild_id, content_hash, author_id);
+
+ALTER TABLE reports ADD COLUMN guild_id BIGINT UNSIGNED NOT NULL DEFAULT 0;
+
+ALTER TABLE rsvps ADD COLUMN guild_id BIGINT UNSIGNED NOT NULL DEFAULT 0;
+CREATE INDEX idx_rsvps_guild_user ON rsvps (guild_id, user_id);
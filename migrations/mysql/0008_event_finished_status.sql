@@ -0,0 +1,3 @@
+-- Approved events are marked FINISHED by the scheduler once they have ended.
+ALTER TABLE events
+    MODIFY status ENUM('PENDING', 'APPROVED', 'REJECTED', 'FINISHED') NOT NULL DEFAULT 'PENDING';
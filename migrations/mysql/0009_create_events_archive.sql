@@ -0,0 +1,5 @@
+-- Finished and rejected events are moved here by the archive job, keeping the events table small.
+CREATE TABLE IF NOT EXISTS events_archive LIKE events;
+
+ALTER TABLE events_archive ADD COLUMN archived_at DATETIME NULL;
+CREATE INDEX idx_events_archive_op_id ON events_archive (op_id);
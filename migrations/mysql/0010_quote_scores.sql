@@ -0,0 +1,4 @@
+-- Thumbs up count of each posted quote, for celebrations and the /topquotes leaderboard.
+ALTER TABLE quotes
+    ADD COLUMN score INT NOT NULL DEFAULT 0,
+    ADD COLUMN celebrated BOOLEAN NOT NULL DEFAULT FALSE;
@@ -0,0 +1,18 @@
+-- SQLite version of the events table. Columns are created with the types the MySQL
+-- migrations end up with, so 0002 has nothing to do here.
+CREATE TABLE IF NOT EXISTS events (
+    uuid VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(500),
+    description TEXT,
+    start_time DATETIME,
+    end_time DATETIME,
+    location VARCHAR(255),
+    op_id BIGINT,
+    op_name VARCHAR(255),
+    original_channel_id BIGINT,
+    event_id BIGINT,
+    event_forum_url VARCHAR(255),
+    event_forum_id BIGINT,
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    hypeman_used BOOLEAN NOT NULL DEFAULT 0
+);
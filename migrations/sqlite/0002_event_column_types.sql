@@ -0,0 +1,2 @@
+-- Nothing to do: 0001 already creates the events table with BIGINT snowflakes,
+-- a boolean hypeman_used and a non-null status.
@@ -0,0 +1,4 @@
+-- Secondary indexes for the status, scheduled event and forum thread lookups.
+CREATE INDEX IF NOT EXISTS idx_events_status ON events (status);
+CREATE INDEX IF NOT EXISTS idx_events_event_id ON events (event_id);
+CREATE INDEX IF NOT EXISTS idx_events_event_forum_id ON events (event_forum_id);
@@ -0,0 +1,13 @@
+-- One row per reported message. Repeat reports inside the coalescing window bump report_count
+-- on the existing moderator post instead of creating a new one.
+CREATE TABLE IF NOT EXISTS reports (
+    message_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    content TEXT,
+    mod_message_id BIGINT NULL,
+    report_count INT NOT NULL DEFAULT 1,
+    posted_at DATETIME NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_reports_posted_at ON reports (posted_at);
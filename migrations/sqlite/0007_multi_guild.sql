@@ -0,0 +1,35 @@
+-- Per-guild channel configuration, so one process can serve many guilds.
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id BIGINT PRIMARY KEY,
+    forum_channel_id BIGINT NULL,
+    admin_channel_id BIGINT NULL,
+    bot_channel_id BIGINT NULL,
+    quote_channel_id BIGINT NULL,
+    mod_channel_id BIGINT NULL,
+    updated_at DATETIME NOT NULL
+);
+
+-- Scope everything by guild. Existing rows get guild 0 and are adopted by GUILD_ID at startup.
+ALTER TABLE events ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_events_guild_id ON events (guild_id);
+
+-- SQLite cannot change a primary key in place, so the quotes table is rebuilt
+CREATE TABLE quotes_by_guild (
+    guild_id BIGINT NOT NULL DEFAULT 0,
+    content_hash CHAR(64) NOT NULL,
+    author_id BIGINT NOT NULL,
+    message_id BIGINT NULL,
+    content TEXT,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (guild_id, content_hash, author_id)
+);
+INSERT INTO quotes_by_guild (content_hash, author_id, message_id, content, created_at)
+    SELECT content_hash, author_id, message_id, content, created_at FROM quotes;
+DROP TABLE quotes;
+ALTER TABLE quotes_by_guild RENAME TO quotes;
+CREATE INDEX IF NOT EXISTS idx_quotes_message_id ON quotes (message_id);
+
+ALTER TABLE reports ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0;
+
+ALTER TABLE rsvps ADD COLUMN guild_id BIGINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_rsvps_guild_user ON rsvps (guild_id, user_id);
@@ -0,0 +1 @@
+-- Nothing to do: the SQLite status column is a plain VARCHAR, so FINISHED needs no schema change.
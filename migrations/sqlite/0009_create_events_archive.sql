@@ -0,0 +1,22 @@
+-- Finished and rejected events are moved here by the archive job, keeping the events table small.
+CREATE TABLE IF NOT EXISTS events_archive (
+    uuid VARCHAR(36) PRIMARY KEY,
+    name VARCHAR(500),
+    description TEXT,
+    start_time DATETIME,
+    end_time DATETIME,
+    location VARCHAR(255),
+    op_id BIGINT,
+    op_name VARCHAR(255),
+    original_channel_id BIGINT,
+    event_id BIGINT,
+    event_forum_url VARCHAR(255),
+    event_forum_id BIGINT,
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    hypeman_used BOOLEAN NOT NULL DEFAULT 0,
+    guild_id BIGINT NOT NULL DEFAULT 0,
+    archived_at DATETIME NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_archive_guild_id ON events_archive (guild_id);
+CREATE INDEX IF NOT EXISTS idx_events_archive_op_id ON events_archive (op_id);
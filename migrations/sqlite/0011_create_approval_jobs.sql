@@ -0,0 +1,22 @@
+-- One row per approved event, recording which steps of the approval have been done so a retry
+-- after an error or a restart picks up where it stopped. The primary key makes a second click
+-- on Approve a no-op.
+CREATE TABLE IF NOT EXISTS approval_jobs (
+    event_uuid VARCHAR(36) PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    approver_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    message_edited BOOLEAN NOT NULL DEFAULT 0,
+    thread_id BIGINT NULL,
+    thread_url VARCHAR(255) NULL,
+    scheduled_event_id BIGINT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT NULL,
+    next_attempt_at DATETIME NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_approval_jobs_status ON approval_jobs (status, guild_id);
@@ -0,0 +1,11 @@
+-- Approval requests of imported events that have not been posted yet. They are posted at a paced
+-- rate and each row is deleted once its request is sent, so an import cut short by a restart is
+-- finished when the bot starts again.
+CREATE TABLE IF NOT EXISTS approval_posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_uuid VARCHAR(36) NOT NULL,
+    guild_id BIGINT NOT NULL,
+    created_at DATETIME NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_approval_posts_guild_id ON approval_posts (guild_id, id);